@@ -4,18 +4,34 @@
 
 __all__ = [
     "register_template", "get_template",
+    "CacheBackend", "LRUCacheBackend", "LLMCache",
     "AgentResult", "ActionResult", "MultiStepAgent"
 ]
 
+import ast
+import hashlib
+import io
 import json
+import logging
+import os
+import re
 import traceback
 import time
-from typing import List
-from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Protocol
+from collections import OrderedDict
 from .model import LLM
-from .session import AgentSession
+from .session import AgentSession, AsyncSessionWriter
 from .tool import Tool
-from .utils import KwargsInitializable, rprint, TemplatedString, parse_response, CodeExecutor, zwarn
+from .utils import KwargsInitializable, LazyKwargs, rprint, TemplatedString, parse_response, CodeExecutor, zwarn
+
+try:  # optional: 3-10x faster JSON encoding for the per-step state/session dumps
+    import orjson
+    def _json_dumps(obj):
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode("utf-8")
+except ImportError:
+    def _json_dumps(obj):
+        return json.dumps(obj, ensure_ascii=False, indent=2)
 
 TEMPLATES = {}
 
@@ -29,6 +45,92 @@ def register_template(templates):
 def get_template(key: str):
     return TemplatedString(TEMPLATES.get(key))
 
+# --
+# exact-match response cache for deterministic LLM calls
+class CacheBackend(Protocol):  # pluggable storage for LLMCache
+    def get(self, key: str): ...
+    def set(self, key: str, value, ttl: int = 0): ...
+
+class LRUCacheBackend:  # default in-process backend: dict LRU with per-entry TTL
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self._data = OrderedDict()  # key -> (expire_time, value)
+
+    def get(self, key: str):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expire_time, value = entry
+        if expire_time and time.time() > expire_time:
+            del self._data[key]  # expired
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value, ttl: int = 0):
+        self._data[key] = ((time.time() + ttl) if ttl > 0 else 0, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)  # evict oldest
+
+class RedisCacheBackend:  # optional backend (requires the redis package)
+    def __init__(self, prefix="llm_cache:", **redis_kwargs):
+        import redis  # lazy import: optional dependency
+        self.prefix = prefix
+        self.client = redis.Redis(**redis_kwargs)
+
+    def get(self, key: str):
+        ret = self.client.get(self.prefix + key)
+        return ret.decode("utf-8") if ret is not None else None
+
+    def set(self, key: str, value, ttl: int = 0):
+        self.client.set(self.prefix + key, value, ex=(ttl if ttl > 0 else None))
+
+class LLMCache:
+    def __init__(self, backend: CacheBackend = None, ttl=3600):
+        self.backend = backend if backend is not None else LRUCacheBackend()
+        self.ttl = ttl
+
+    @staticmethod
+    def make_key(model, messages):
+        # only deterministic calls are cacheable (temperature==0)
+        _temperature = getattr(model, "extract_body", {}).get("temperature", getattr(model, "temperature", 0))
+        if _temperature != 0:
+            return None
+        try:
+            _blob = json.dumps({"model": getattr(model, "model", None), "messages": messages, "temperature": _temperature}, sort_keys=True, ensure_ascii=False)
+        except (TypeError, ValueError):  # unserializable messages -> uncacheable
+            return None
+        return hashlib.sha256(_blob.encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        return self.backend.get(key)
+
+    def set(self, key: str, value):
+        self.backend.set(key, value, ttl=self.ttl)
+
+# --
+# per-session memoization wrapper for side-effect-free tools (results go to session.tool_cache)
+class _MemoTool:
+    def __init__(self, fn, cache):
+        self.fn = fn
+        self.cache = cache
+        self.name = getattr(fn, "name", getattr(fn, "__name__", str(fn)))
+
+    def __getattr__(self, item):  # delegate everything else to the wrapped tool
+        return getattr(self.fn, item)
+
+    def __call__(self, *args, **kwargs):
+        try:
+            key = hashlib.sha256((self.name + repr(sorted(kwargs.items())) + repr(args)).encode("utf-8")).hexdigest()
+        except TypeError:  # unhashable/unorderable args -> just call through
+            return self.fn(*args, **kwargs)
+        if key in self.cache:
+            return self.cache[key]
+        ret = self.fn(*args, **kwargs)
+        self.cache[key] = ret
+        return ret
+
 # --
 # storage of the results for an agent call
 class AgentResult(KwargsInitializable):
@@ -73,6 +175,41 @@ class StopReasons:
 
 CODE_ERROR_PERFIX = "Code Execution Error:\n"
 
+# static pieces of the repeat-output warning (only the count and a short observation prefix vary per step)
+_REPEAT_WARNING_HEAD = "Notice: The last step produced the exact same output as before (repeated "
+_REPEAT_WARNING_MID = " times): "
+_REPEAT_WARNING_TAIL = (
+    "\nIf the task is complete, call stop(output=<YOUR_FINAL_ANSWER>, log='...') NOW to finalize.\n"
+    "Otherwise, investigate why the result repeated (e.g., state not updated, code had no effect) BEFORE continuing.\n"
+    "Good cases:\n"
+    "- stop(output=<YOUR_FINAL_ANSWER>, log='Answer verified; finalizing')\n"
+    "- Update progress state (e.g., add a completed note) and produce a DIFFERENT next action.\n"
+    "Bad cases:\n"
+    "- Printing the same output again without any change.\n"
+    "- Continuing without calling stop when the result is already final."
+)
+
+# --
+# restricted evaluation of model-emitted state/result expressions
+_SAFE_EVAL_BUILTINS = {"dict": dict, "list": list, "tuple": tuple, "set": set, "str": str, "int": int, "float": float, "bool": bool, "len": len}
+_EVAL_CACHE = OrderedDict()  # source -> compiled code object (bounded)
+_EVAL_CACHE_SIZE = 256
+
+def _safe_eval(src: str):
+    try:  # fast path: plain literal dict/list, no compile machinery at all
+        return ast.literal_eval(src)
+    except Exception:
+        pass
+    co = _EVAL_CACHE.get(src)
+    if co is None:
+        co = compile(src, "<state>", "eval")
+        _EVAL_CACHE[src] = co
+        while len(_EVAL_CACHE) > _EVAL_CACHE_SIZE:
+            _EVAL_CACHE.popitem(last=False)
+    else:
+        _EVAL_CACHE.move_to_end(src)
+    return eval(co, {"__builtins__": _SAFE_EVAL_BUILTINS})
+
 # --
 # a basic class for a multi-step agent
 class MultiStepAgent(KwargsInitializable):
@@ -89,9 +226,12 @@ class MultiStepAgent(KwargsInitializable):
         self.max_time_limit = 0  # early stop if exceeding this time (in seconds)
         self.recent_steps = 5  # feed recent steps
         self.store_io = True  # whether store the inputs/outputs of the model in session
+        self.compact_steps = 0  # if >0, drop llm_input/llm_output from steps older than this many (see AgentSession.compact)
+        self.session_log_path = ""  # if set, stream step events to this JSONL file via a background writer
         self.exec_timeout_with_call = 0  # how many seconds to timeout for each exec (0 means no timeout) (with sub-agent call)
         self.exec_timeout_wo_call = 0  # how many seconds to timeout for each exec (0 means no timeout) (without sub-agent call)
         self.obs_max_token = 8192  # avoid obs that is too long
+        self.llm_cache = LLMCache()  # exact-match cache for deterministic (temperature==0) step calls
         # --
         self.active_functions = []  # note: put active functions here!
         # --
@@ -101,12 +241,25 @@ class MultiStepAgent(KwargsInitializable):
         ALL_FUNCTIONS = {z.name: z for z in (self.sub_agents + self.tools)}
         assert len(ALL_FUNCTIONS) == len(self.sub_agents + self.tools), "There may be repeated function names of sub-agents and tools."
         self.ACTIVE_FUNCTIONS = {k: ALL_FUNCTIONS[k] for k in self.active_functions}
+        self._subagent_tool_strs = {}  # cached function-definition blocks (static over the agent lifetime)
+        self._code_executor = None  # reused across steps (namespace snapshot/restore keeps steps isolated)
+        self._session_writer = None  # lazily created AsyncSessionWriter for session_log_path
+        self._obs_str_cache = {}  # step_idx -> formatted observation (each observation is scanned/truncated once per run)
+        # single-pass scan for "does this code call a sub-agent" instead of one substring search per name
+        self._subagent_re = re.compile("|".join(map(re.escape, self.sub_agent_names))) if self.sub_agent_names else None
+        self.tool_concurrency = int(os.getenv("TOOL_CONCURRENCY_LIMIT", "8"))  # workers for parallel_map/parallel_call
+        self._tool_pool = None  # lazily created per-agent ThreadPoolExecutor for parallel tool dispatch
+        self._exec_functions_cache = None  # (session_id, functions dict) reused across the session's steps
         self.final_result = None  # to store final result
         # --
-        # repeat-output tracking for minimal prompt nudging
-        self._last_observation_text = None
+        # repeat-output tracking for minimal prompt nudging (compare hashes, not multi-KB strings)
+        self._last_obs_hash = None
         self._repeat_count = 0
         self._repeat_warning_msg = ""
+        self._error_count = 0  # incremental count of error steps (maintained in step/init_run)
+        # memoized JSON encoding of the progress state (bumped whenever the plan path mutates it)
+        self._state_version = 0
+        self._state_json_cache = None
 
     @property
     def sub_agents(self):  # obtaining the sub-agents by getattr
@@ -153,9 +306,12 @@ class MultiStepAgent(KwargsInitializable):
         # run them!
         start_pc = time.perf_counter()
         # reset repeat-tracking per run
-        self._last_observation_text = None
+        self._last_obs_hash = None
         self._repeat_count = 0
         self._repeat_warning_msg = ""
+        self._state_version += 1  # fresh progress state for this run
+        self._state_json_cache = None
+        self._obs_str_cache.clear()
 
         self.init_run(session)  # start
 
@@ -163,56 +319,77 @@ class MultiStepAgent(KwargsInitializable):
         stop_reason = None
         while True:
             step_idx = session.num_of_steps()
-            _error_counts = sum(self.get_obs_str(z['action']).strip().startswith(CODE_ERROR_PERFIX) for z in session.steps)
+            _error_counts = self._error_count  # maintained incrementally (avoid O(steps^2) re-scan)
             elapsed_time = time.perf_counter() - start_pc
-            # 埋点：打印每步的限制检查
-            print(f"[yield_session_run] Step {step_idx}: error_counts={_error_counts}, elapsed={elapsed_time:.1f}s")
-            print(f"[yield_session_run] Limits: max_steps={max_steps}, max_time_limit={self.max_time_limit}")
+            # 埋点：每步的限制检查（仅在 DEBUG 级别时才格式化，避免热循环里的无谓 I/O）
+            _dbg = self.logger is not None and self.logger.isEnabledFor(logging.DEBUG)
+            if _dbg:
+                self.logger.debug("[yield_session_run] Step %s: error_counts=%s, elapsed=%.1fs", step_idx, _error_counts, elapsed_time)
+                self.logger.debug("[yield_session_run] Limits: max_steps=%s, max_time_limit=%s", max_steps, self.max_time_limit)
             if (step_idx >= max_steps + _error_counts) or (step_idx >= int(max_steps*1.5)):  # make up for the errors (but avoid too many steps)
-                print(f"[yield_session_run] STOP: MAX_STEP reached (step_idx={step_idx}, limit={max_steps + _error_counts} or {int(max_steps*1.5)})")
+                if _dbg:
+                    self.logger.debug("[yield_session_run] STOP: MAX_STEP reached (step_idx=%s, limit=%s or %s)", step_idx, max_steps + _error_counts, int(max_steps*1.5))
                 stop_reason = StopReasons.MAX_STEP  # step limit
                 break
             if (self.max_time_limit > 0) and (elapsed_time > self.max_time_limit):
-                print(f"[yield_session_run] STOP: MAX_TIME reached (elapsed={elapsed_time:.1f}s, limit={self.max_time_limit}s)")
+                if _dbg:
+                    self.logger.debug("[yield_session_run] STOP: MAX_TIME reached (elapsed=%.1fs, limit=%ss)", elapsed_time, self.max_time_limit)
                 stop_reason = StopReasons.MAX_TIME  # time limit
                 break
             rprint(f"# ======\nAgent {self.name} -- Step {step_idx}", timed=True)
             _step_info = {"step_idx": step_idx}
             session.add_step(_step_info)  # simply append before running
-            yield from self.step(session, progress_state)
+            yield from self._yield_persisted(session, self.step(session, progress_state))
             if self.step_check_end(session):
                 stop_reason = StopReasons.NORMAL_END
                 break
         rprint(f"# ======\nAgent {self.name} -- Stop reason={stop_reason}", timed=True)
-        yield from self.finalize(session, progress_state, stop_reason)  # ending!
+        yield from self._yield_persisted(session, self.finalize(session, progress_state, stop_reason))  # ending!
         self.end_run(session)
         # --
 
+    def _yield_persisted(self, session, events):
+        # pass events through immediately; optionally mirror them to the background JSONL writer
+        if not self.session_log_path:
+            yield from events
+            return
+        if self._session_writer is None:
+            self._session_writer = AsyncSessionWriter(self.session_log_path)
+        for one_event in events:
+            self._session_writer.put({"session_id": session.id, **one_event})
+            yield one_event
+
     def step(self, session, state):
         _input_kwargs, _extra_kwargs = self.step_prepare(session, state)
         _current_step = session.get_current_step()
+        if "plan_and_action" in self.templates:  # merged variant: one LLM round-trip for plan + action
+            yield from self._step_merged(session, state, _input_kwargs, _extra_kwargs, _current_step)
+            return
         # planning
         has_plan_template = "plan" in self.templates
         if has_plan_template:  # planning to update state
-            plan_messages = self.templates["plan"].format(**_input_kwargs)
-            # 埋点：LLM 规划调用
-            if hasattr(self, 'logger') and self.logger:
+            yield {"type": "plan_started", "step_info": _current_step}  # let stream consumers update before the LLM call returns
+            plan_messages = self.templates["plan"].format_map(_input_kwargs)
+            # 埋点：LLM 规划调用（加 isEnabledFor 守卫，禁用时跳过切片与格式化）
+            _log_info = self.logger is not None and self.logger.isEnabledFor(logging.INFO)
+            if _log_info:
                 self.logger.info("[WEB_LLM_PLAN] Task: %s", session.task[:200] + "..." if len(session.task) > 200 else session.task)
             plan_response = self.step_call(messages=plan_messages, session=session)
             plan_res = self._parse_output(plan_response)
             # 埋点：LLM 规划结果
-            if hasattr(self, 'logger') and self.logger:
+            if _log_info:
                 self.logger.info("[WEB_LLM_PLAN] Response: %s", plan_response[:500] + "..." if len(plan_response) > 500 else plan_response)
                 self.logger.info("[WEB_LLM_PLAN] Parsed: %s", plan_res)
             # state update
             if plan_res["code"]:
                 try:
-                    new_state = eval(plan_res["code"])  # directly eval
+                    new_state = _safe_eval(plan_res["code"])  # restricted eval (literals + basic constructors)
                 except:
                     new_state = None
                 if new_state:  # note: inplace update!
                     state.clear()
                     state.update(new_state)
+                    self._state_version += 1
                 else:
                     zwarn("State NOT changed due to empty output!")
             else:
@@ -222,6 +399,7 @@ class MultiStepAgent(KwargsInitializable):
                         state['experience'].append(f'Jailbreak or content filter violation detected for the action {_input_kwargs["recent_steps_str"].split("Action:")[1]}. Please modify your prompt or stop with N/A.')
                     else:
                         state['experience'] = []
+                    self._state_version += 1
                     # hardcode here: disable the current visual_content if jailbreaking. This is because most jailbreak happens for images.
                     _input_kwargs['visual_content'] = None
             # update session step
@@ -232,15 +410,16 @@ class MultiStepAgent(KwargsInitializable):
             yield {"type": "plan", "step_info": _current_step}
         # predict action
         _action_input_kwargs = _input_kwargs.copy()
-        _action_input_kwargs["state"] = json.dumps(state, ensure_ascii=False, indent=2)  # there can be state updates
-        action_messages = self.templates["action"].format(**_action_input_kwargs)
+        _action_input_kwargs["state"] = self._dump_state(state)  # there can be state updates
+        action_messages = self.templates["action"].format_map(_action_input_kwargs)
         # Inject minimal repeat-warning hint for NEXT step if previous outputs repeated
         if getattr(self, "_repeat_warning_msg", ""):
             if isinstance(action_messages, list):
                 action_messages = list(action_messages)
                 action_messages.append({"role": "user", "content": self._repeat_warning_msg})
-        # 埋点：LLM 动作调用
-        if hasattr(self, 'logger') and self.logger:
+        # 埋点：LLM 动作调用（禁用时跳过 URL 提取扫描）
+        _log_info = self.logger is not None and self.logger.isEnabledFor(logging.INFO)
+        if _log_info:
             current_url = "unknown"
             if "web_page" in _action_input_kwargs:
                 # 尝试从 accessibility tree 中提取 URL
@@ -255,37 +434,70 @@ class MultiStepAgent(KwargsInitializable):
         action_response = self.step_call(messages=action_messages, session=session)
         action_res = self._parse_output(action_response)
         # 埋点：LLM 动作结果
-        if hasattr(self, 'logger') and self.logger:
+        if _log_info:
             self.logger.info("[WEB_LLM_ACTION] Response: %s", action_response[:500] + "..." if len(action_response) > 500 else action_response)
             self.logger.info("[WEB_LLM_ACTION] Actions: %s", action_res.get('code', 'No code generated'))
-        # perform action
-        step_res = self.step_action(action_res, _action_input_kwargs, **_extra_kwargs)
+        # perform action (shared bookkeeping with the merged path)
+        yield from self._perform_and_record_action(session, _current_step, action_res, action_messages, action_response, _action_input_kwargs, _extra_kwargs)
+        # --
+
+    def _step_merged(self, session, state, _input_kwargs, _extra_kwargs, _current_step):
+        # a single call produces both the plan update and the next action; the template must make the
+        # model reply with "PlanThought:" + "State:" (raw dict) + "Thought:" + "Code:" (fenced) sections
+        yield {"type": "plan_started", "step_info": _current_step}
+        messages = self.templates["plan_and_action"].format_map(_input_kwargs)
+        if getattr(self, "_repeat_warning_msg", "") and isinstance(messages, list):
+            messages = list(messages)
+            messages.append({"role": "user", "content": self._repeat_warning_msg})
+        response = self.step_call(messages=messages, session=session)
+        _parsed = parse_response(response, ["PlanThought:", "State:", "Thought:", "Code:"], return_dict=True)
+        plan_res = {"thought": _parsed["PlanThought:"], "code": (_parsed["State:"] or "")}
+        if plan_res["code"]:
+            try:
+                new_state = _safe_eval(plan_res["code"])
+            except:
+                new_state = None
+            if new_state:  # note: inplace update!
+                state.clear()
+                state.update(new_state)
+                self._state_version += 1
+            else:
+                zwarn("State NOT changed due to empty output!")
+        _current_step["plan"] = plan_res
+        plan_res["state"] = state.copy()  # after updating the progress state (make a copy)
+        if self.store_io:  # further storage
+            plan_res.update({"llm_input": messages, "llm_output": response})
+        yield {"type": "plan", "step_info": _current_step}
+        # the action part comes from the same response
+        _action_input_kwargs = _input_kwargs.copy()
+        _action_input_kwargs["state"] = self._dump_state(state)
+        action_res = {"thought": _parsed["Thought:"], "code": CodeExecutor.extract_code(response)}
+        yield from self._perform_and_record_action(session, _current_step, action_res, messages, response, _action_input_kwargs, _extra_kwargs)
+
+    def _perform_and_record_action(self, session, _current_step, action_res, action_messages, action_response, _action_input_kwargs, _extra_kwargs):
+        step_res = self.step_action(action_res, _action_input_kwargs, session=session, **_extra_kwargs)
         # update session info
         _current_step["action"] = action_res
         action_res["observation"] = step_res  # after executing the step
+        if self.get_obs_str(action_res).strip().startswith(CODE_ERROR_PERFIX):
+            self._error_count += 1
         # update repeat-tracking for next step
         _obs_txt = self._normalize_observation(step_res)
-        if _obs_txt and _obs_txt == self._last_observation_text:
+        _obs_hash = hash(_obs_txt) if _obs_txt else None  # O(1) int compare afterwards
+        if _obs_hash is not None and _obs_hash == self._last_obs_hash:
             self._repeat_count += 1
         else:
             self._repeat_count = 0
-        self._last_observation_text = _obs_txt
+        self._last_obs_hash = _obs_hash
         if self._repeat_count > 0 and _obs_txt:
-            self._repeat_warning_msg = (
-                f"Notice: The last step produced the exact same output as before (repeated {self._repeat_count + 1} times): {_obs_txt}\n"
-                "If the task is complete, call stop(output=<YOUR_FINAL_ANSWER>, log='...') NOW to finalize.\n"
-                "Otherwise, investigate why the result repeated (e.g., state not updated, code had no effect) BEFORE continuing.\n"
-                "Good cases:\n"
-                "- stop(output=<YOUR_FINAL_ANSWER>, log='Answer verified; finalizing')\n"
-                "- Update progress state (e.g., add a completed note) and produce a DIFFERENT next action.\n"
-                "Bad cases:\n"
-                "- Printing the same output again without any change.\n"
-                "- Continuing without calling stop when the result is already final."
-            )
+            _obs_prefix = _obs_txt if len(_obs_txt) <= 256 else f"{_obs_txt[:256]} ..."  # keep the hint short
+            self._repeat_warning_msg = "".join([_REPEAT_WARNING_HEAD, str(self._repeat_count + 1), _REPEAT_WARNING_MID, _obs_prefix, _REPEAT_WARNING_TAIL])
         else:
             self._repeat_warning_msg = ""
         if self.store_io:  # further storage
             action_res.update({"llm_input": action_messages, "llm_output": action_response})
+        if self.compact_steps > 0:  # keep only the recent window of full step IO in memory
+            session.compact(keep_recent=self.compact_steps)
         yield {"type": "action", "step_info": _current_step}
         # --
 
@@ -304,7 +516,7 @@ class MultiStepAgent(KwargsInitializable):
             if final_results:
                 stop_reason = f"{stop_reason} (with the result of {final_results})"
             _input_kwargs["stop_reason"] = stop_reason
-            end_messages = self.templates["end"].format(**_input_kwargs)
+            end_messages = self.templates["end"].format_map(_input_kwargs)
             end_response = self.step_call(messages=end_messages, session=session)
             end_res = self._parse_output(end_response)
             if self.store_io:  # further storage
@@ -315,7 +527,7 @@ class MultiStepAgent(KwargsInitializable):
         _current_step = session.get_current_step()
         if has_end_template or final_results is None:  # try to get final results, end_module can override final_results
             try:
-                final_results = eval(end_res["code"])
+                final_results = _safe_eval(end_res["code"])
                 assert isinstance(final_results, dict) and "output" in final_results and "log" in final_results
             except Exception as e:  # use the final step's observation as the result!
                 # 埋点：finalizing step 错误详情
@@ -346,38 +558,88 @@ class MultiStepAgent(KwargsInitializable):
     def get_obs_str(self, action, obs=None, add_seq_enum=True):
         if obs is None:
             obs = action.get("observation", "None")
-        if isinstance(obs, (list, tuple)):  # list them
-            ret = "\n".join([(f"- Result {ii}: {zz}" if add_seq_enum else str(zz)) for ii, zz in enumerate(obs)])
+        _cap = self.obs_max_token
+        if isinstance(obs, (list, tuple)):  # list them (stop formatting once past the cap; the tail gets truncated anyway)
+            buf, total = [], 0
+            for ii, zz in enumerate(obs):
+                one_str = (f"- Result {ii}: {zz}" if add_seq_enum else str(zz))
+                buf.append(one_str)
+                total += len(one_str) + 1
+                if total > _cap:
+                    break
+            ret = "\n".join(buf)
         else:
             ret = str(obs)
         # --
-        if len(ret) > self.obs_max_token:
-            ret = f"{ret[:self.obs_max_token]} ... (observation string truncated: exceeded {self.obs_max_token} characters)"
+        if len(ret) > _cap:
+            ret = f"{ret[:_cap]} ... (observation string truncated: exceeded {_cap} characters)"
         return ret
 
     # common preparations of inputs
     def _prepare_common_input_kwargs(self, session, state):
         # previous steps
         _recent_steps = session.get_latest_steps(count=self.recent_steps)  # no including the last which is simply empty
-        _recent_steps_str = "\n\n".join([f"### Step {ss['step_idx']}\nThought: {ss['action']['thought']}\nAction: ```\n{ss['action']['code']}```\nObservation: {self.get_obs_str(ss['action'])}" for ii, ss in enumerate(_recent_steps)])
         _current_step = session.get_current_step()
-        _current_step_action = _current_step.get("action", {})
-        _current_step_str = f"Thought: {_current_step_action.get('thought')}\nAction: ```\n{_current_step_action.get('code')}```\nObservation: {self.get_obs_str(_current_step_action)}"
         # tools and sub-agents
-        ret = {
-            "task": session.task, "state": json.dumps(state, ensure_ascii=False, indent=2),
-            "recent_steps": _recent_steps, "recent_steps_str": _recent_steps_str,
-            "current_step": _current_step, "current_step_str": _current_step_str,
-        }
-        for short in [True, False]:
+        ret = LazyKwargs({
+            "task": session.task, "state": self._dump_state(state),
+            "recent_steps": _recent_steps, "current_step": _current_step,
+        })
+        # heavy strings (can embed tens of KB of step history) are only built if the template references them
+        ret.set_lazy("recent_steps_str", lambda: self._build_recent_steps_str(_recent_steps))
+        ret.set_lazy("current_step_str", lambda: self._build_current_step_str(_current_step))
+        ret["subagent_tool_str_short"] = self._get_subagent_tool_str(short=True)
+        ret["subagent_tool_str_long"] = self._get_subagent_tool_str(short=False)
+        # --
+        return ret
+
+    def _build_recent_steps_str(self, recent_steps):
+        # stream into one buffer with an overall size cap instead of materializing every piece first
+        buf = io.StringIO()
+        _cap = self.obs_max_token * max(1, self.recent_steps)
+        for ii, ss in enumerate(recent_steps):
+            if ii > 0:
+                buf.write("\n\n")
+            buf.write(f"### Step {ss['step_idx']}\nThought: {ss['action']['thought']}\nAction: ```\n{ss['action']['code']}```\nObservation: {self._get_step_obs_str(ss)}")
+            if buf.tell() > _cap:
+                buf.write("\n... (recent steps truncated: size cap reached)")
+                break
+        return buf.getvalue()
+
+    def _build_current_step_str(self, current_step):
+        _current_step_action = current_step.get("action", {})
+        return f"Thought: {_current_step_action.get('thought')}\nAction: ```\n{_current_step_action.get('code')}```\nObservation: {self._get_step_obs_str(current_step)}"
+
+    def _get_step_obs_str(self, step_dict):
+        # a finished step's observation never changes, so format/truncate it only once per run
+        _action = step_dict.get("action") or {}
+        _idx = step_dict.get("step_idx")
+        if _idx is None or "observation" not in _action:  # not cacheable (e.g. step still running)
+            return self.get_obs_str(_action)
+        ret = self._obs_str_cache.get(_idx)
+        if ret is None:
+            ret = self.get_obs_str(_action)
+            self._obs_str_cache[_idx] = ret
+        return ret
+
+    def _get_subagent_tool_str(self, short: bool):
+        # definitions are static once tools/sub-agents are resolved, so build each variant only once
+        _kkk = "short" if short else "long"
+        ret = self._subagent_tool_strs.get(_kkk)
+        if ret is None:
             _subagent_str = "## Sub-Agent Functions\n" + "\n".join([z.get_function_definition(short) for z in self.sub_agents])
             _tool_str = "## Tool Functions\n" + "\n".join([z.get_function_definition(short) for z in self.tools])
-            _subagent_tool_str = f"{_subagent_str}\n\n{_tool_str}"
-            _kkk = "subagent_tool_str_short" if short else "subagent_tool_str_long"
-            ret[_kkk] = _subagent_tool_str
-        # --
+            ret = f"{_subagent_str}\n\n{_tool_str}"
+            self._subagent_tool_strs[_kkk] = ret
         return ret
 
+    def _dump_state(self, state):
+        # re-encode only when the plan path has mutated the state since the last dump
+        _ver = self._state_version
+        if self._state_json_cache is None or self._state_json_cache[0] != _ver:
+            self._state_json_cache = (_ver, _json_dumps(state))
+        return self._state_json_cache[1]
+
     def _parse_output(self, output: str):
         _target_list = ["Thought:", "Code:"]
         if (output is None) or (output.strip() == ""):
@@ -407,15 +669,33 @@ class MultiStepAgent(KwargsInitializable):
     # to be implemented in sub-classes
 
     def init_run(self, session):
-        pass
+        # seed the incremental error counter (non-empty only when resuming a session)
+        self._error_count = sum(self.get_obs_str(z["action"]).strip().startswith(CODE_ERROR_PERFIX) for z in getattr(session, "steps", ()) if "action" in z)
 
     def end_run(self, session):
-        pass
+        if self._tool_pool is not None:  # release parallel-dispatch workers (recreated lazily next run)
+            self._tool_pool.shutdown(wait=False)
+            self._tool_pool = None
+        if self._session_writer is not None:  # flush pending records to disk
+            self._session_writer.close()
+            self._session_writer = None
 
     def step_call(self, messages, session, model=None):
         if model is None:
             model = self.model
+        cache_key = LLMCache.make_key(model, messages) if self.llm_cache is not None else None
+        if cache_key is not None:
+            _stats = getattr(model, "cache_stats", None)
+            if _stats is None:
+                _stats = model.cache_stats = {"hit": 0, "miss": 0}
+            cached = self.llm_cache.get(cache_key)
+            if cached is not None:
+                _stats["hit"] += 1
+                return cached
+            _stats["miss"] += 1
         response = model(messages)
+        if cache_key is not None:
+            self.llm_cache.set(cache_key, response)
         return response
 
     def step_prepare(self, session, state):
@@ -423,14 +703,68 @@ class MultiStepAgent(KwargsInitializable):
         _extra_kwargs = {}
         return _input_kwargs, _extra_kwargs
 
-    def step_action(self, action_res, action_input_kwargs, **kwargs):
-        python_executor = CodeExecutor()
-        python_executor.add_global_vars(**self.ACTIVE_FUNCTIONS)  # to avoid that things might get re-defined at some place ...
-        _exec_timeout = self.exec_timeout_with_call if any((z in action_res["code"]) for z in self.sub_agent_names) else self.exec_timeout_wo_call  # choose timeout value
-        python_executor.run(action_res["code"], catch_exception=True, timeout=_exec_timeout)  # handle err inside!
-        ret = python_executor.get_print_results()  # currently return a list of printed results
-        rprint(f"Obtain action res = {ret}", style="white on yellow")
+    def get_executor_functions(self, session=None):
+        # wrap side-effect-free tools (tool.stateful==False) with per-session memoization;
+        # the assembled dict is constant for a given session, so cache it per session id
+        _session_id = getattr(session, "id", None) if session is not None else None
+        if self._exec_functions_cache is not None and self._exec_functions_cache[0] == _session_id:
+            return self._exec_functions_cache[1]
+        tool_cache = getattr(session, "tool_cache", None) if session is not None else None
+        if tool_cache is None:
+            ret = dict(self.ACTIVE_FUNCTIONS)
+        else:
+            ret = {n: (_MemoTool(fn, tool_cache) if getattr(fn, "stateful", True) is False else fn) for n, fn in self.ACTIVE_FUNCTIONS.items()}
+        ret.update(parallel_map=self.parallel_map, parallel_call=self.parallel_call)  # concurrent dispatch helpers
+        self._exec_functions_cache = (_session_id, ret)
+        return ret
+
+    def _ensure_tool_pool(self):
+        if self._tool_pool is None:
+            self._tool_pool = ThreadPoolExecutor(max_workers=self.tool_concurrency, thread_name_prefix="tool_pool")
+        return self._tool_pool
+
+    def parallel_map(self, fn, items):
+        # run fn over items concurrently (for independent I/O-bound tool calls); results keep input order
+        return self.parallel_call([(fn, (one_item,)) for one_item in items])
+
+    def parallel_call(self, calls):
+        # calls: list of (fn,), (fn, args) or (fn, args, kwargs); per-item exceptions are wrapped, not raised
+        pool = self._ensure_tool_pool()
+        futures = []
+        for one_call in calls:
+            fn = one_call[0]
+            args = one_call[1] if len(one_call) > 1 else ()
+            kw = one_call[2] if len(one_call) > 2 else {}
+            futures.append(pool.submit(fn, *args, **kw))
+        rets = []
+        for one_future in futures:
+            try:
+                rets.append(one_future.result())
+            except Exception as e:  # keep the other results even if one call fails
+                rets.append(f"Tool Execution Error: {e}")
+        return rets
+
+    def _run_action_code(self, action_res, session=None):
+        if self._code_executor is None:
+            self._code_executor = CodeExecutor()
+        python_executor = self._code_executor
+        _saved_globals = dict(python_executor.globals)  # snapshot for step isolation
+        try:
+            python_executor.add_global_vars(**self.get_executor_functions(session))  # to avoid that things might get re-defined at some place ...
+            _has_subagent_call = bool(self._subagent_re.search(action_res["code"])) if self._subagent_re is not None else False
+            _exec_timeout = self.exec_timeout_with_call if _has_subagent_call else self.exec_timeout_wo_call  # choose timeout value
+            python_executor.run(action_res["code"], catch_exception=True, timeout=_exec_timeout)  # handle err inside!
+            ret = python_executor.get_print_results()  # currently return a list of printed results
+        finally:  # restore: definitions from this step must not leak into the next one
+            python_executor.globals.clear()
+            python_executor.globals.update(_saved_globals)
+        if self.logger is None or self.logger.isEnabledFor(logging.DEBUG):
+            # ret can be large; skip the f-string formatting and console IO unless wanted
+            rprint(f"Obtain action res = {ret}", style="white on yellow")
         return ret  # return a result str
 
+    def step_action(self, action_res, action_input_kwargs, session=None, **kwargs):
+        return self._run_action_code(action_res, session=session)
+
     def step_check_end(self, session):
         return self.has_final_result()
@@ -4,7 +4,8 @@ Pure HTTP LLM Client - Linus style: simple, direct, fail fast
 No provider abstraction, no defensive programming, no technical debt
 """
 
-import requests
+import importlib.util
+
 from .utils import wrapped_trying, KwargsInitializable
 
 
@@ -12,29 +13,123 @@ class RateLimitError(Exception):
     """Special exception for HTTP 429 rate limit errors"""
     pass
 
+# Availability check without paying the import: tiktoken (and requests below) load lazily on
+# first use, so workers that never construct an LLM skip their import cost entirely
+_HAS_TIKTOKEN = importlib.util.find_spec("tiktoken") is not None
+
 try:
-    import tiktoken
+    import httpx  # optional: only needed for the async LLM interface
+except ImportError:
+    httpx = None
+
+try:
+    import orjson  # optional: C-speed (de)serialization for large payloads
 except ImportError:
-    tiktoken = None
+    orjson = None
+
+import asyncio
+import json
+from bisect import bisect_right
+from itertools import accumulate
+
+
+def _json_dumps_bytes(obj) -> bytes:
+    """Serialize a request payload to JSON bytes, preferring orjson"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+
+def _json_loads(data):
+    """Parse JSON from response bytes, preferring orjson"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+import functools
+from collections import OrderedDict
+
+
+@functools.lru_cache(maxsize=32)
+def _get_encoding(model_name: str):
+    """Load the BPE encoding once per model name (encoding_for_model parses the merge table each call)"""
+    import tiktoken
+    return tiktoken.encoding_for_model(model_name)
+
+
+@functools.lru_cache(maxsize=32)
+def get_message_truncator(model_name="gpt-4"):
+    """Shared truncator per model name, so the default encoding loads exactly once per process"""
+    if _HAS_TIKTOKEN:
+        return TikTokenMessageTruncator(model_name)
+    return _LightweightMessageTruncator()
+
+
+_async_client = None
+
+def _get_async_client(timeout):
+    """Lazily build one shared AsyncClient so concurrent calls share a keep-alive pool"""
+    global _async_client
+    if _async_client is None:
+        if httpx is None:
+            raise ImportError("httpx is required for async LLM calls but not installed")
+        _async_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=32), timeout=timeout)
+    return _async_client
 
 
 class TikTokenMessageTruncator:
     def __init__(self, model_name="gpt-4"):
-        if tiktoken is None:
+        if not _HAS_TIKTOKEN:
             # Fallback will be used by MessageTruncator alias when tiktoken is missing
             # Keep class importable but non-functional if instantiated directly without tiktoken
             raise ImportError("tiktoken is required but not installed")
-        self.encoding = tiktoken.encoding_for_model(model_name)
+        self.encoding = _get_encoding(model_name)
+        self._count_cache = OrderedDict()  # text -> token count (LRU); histories re-send the same messages each call
+        self._count_cache_maxsize = 4096
+
+    def _count_string_tokens(self, text: str):
+        """Token count for one string, memoized (the same history is re-tokenized on every LLM call otherwise)"""
+        _cache = self._count_cache
+        ret = _cache.get(text)
+        if ret is not None:
+            _cache.move_to_end(text)
+            return ret
+        ret = len(self.encoding.encode(text))
+        _cache[text] = ret
+        if len(_cache) > self._count_cache_maxsize:
+            _cache.popitem(last=False)
+        return ret
+
+    def _warm_count_cache(self, messages):
+        """Batch-encode all uncached text up front: one Rust-side call beats per-part encode round-trips"""
+        texts = []
+        for msg in messages:
+            content = msg.get("content", "")
+            if isinstance(content, str):
+                texts.append(content)
+            elif isinstance(content, list):
+                for part in content:
+                    if part.get("type") == "text":
+                        texts.append(part.get("text", ""))
+        _cache = self._count_cache
+        todo = [t for t in set(texts) if t not in _cache]
+        if not todo:
+            return
+        for text, tokens in zip(todo, self.encoding.encode_ordinary_batch(todo)):
+            _cache[text] = len(tokens)
+        while len(_cache) > self._count_cache_maxsize:
+            _cache.popitem(last=False)
 
     def _count_text_tokens(self, content):
         """Count tokens in a message's content"""
         if isinstance(content, str):
-            return len(self.encoding.encode(content))
+            return self._count_string_tokens(content)
         elif isinstance(content, list):
             total = 0
             for part in content:
                 if part.get("type") == "text":
-                    total += len(self.encoding.encode(part.get("text", "")))
+                    total += self._count_string_tokens(part.get("text", ""))
             return total
         else:
             return 0
@@ -71,47 +166,56 @@ class TikTokenMessageTruncator:
 
     def truncate_message_list(self, messages, max_length):
         """Truncate a list of messages to fit max_length tokens"""
-        truncated = []
-        total_tokens = 0
-        for msg in reversed(messages):
+        # cheap guard before the tokenizer: every BPE token covers >=1 UTF-8 byte, so the byte
+        # count is a true upper bound on tokens (a chars-based heuristic would be wrong for CJK)
+        approx_bytes = 0
+        for msg in messages:
             content = msg.get("content", "")
-            tokens = self._count_text_tokens(content)
-            if total_tokens + tokens > max_length:
-                if not truncated:
-                    truncated_content = self._truncate_text_content(content, max_length)
-                    truncated_msg = msg.copy()
-                    truncated_msg["content"] = truncated_content
-                    truncated.insert(0, truncated_msg)
-                break
-            truncated.insert(0, msg)
-            total_tokens += tokens
-        return truncated
+            if isinstance(content, str):
+                approx_bytes += len(content.encode("utf-8"))
+            elif isinstance(content, list):
+                for part in content:
+                    if part.get("type") == "text":
+                        approx_bytes += len(part.get("text", "").encode("utf-8"))
+        if approx_bytes <= max_length:
+            return messages
+        self._warm_count_cache(messages)
+        # suffix sums over cached counts + bisect find the longest fitting tail in C
+        counts = [self._count_text_tokens(m.get("content", "")) for m in messages]
+        suffix_sums = list(accumulate(reversed(counts)))
+        keep = bisect_right(suffix_sums, max_length)
+        if keep == 0 and messages:
+            # newest message alone exceeds the budget - truncate its content
+            newest = messages[-1]
+            truncated_msg = newest.copy()
+            truncated_msg["content"] = self._truncate_text_content(newest.get("content", ""), max_length)
+            return [truncated_msg]
+        return messages[len(messages) - keep:]
 
 
 
 # Lightweight fallback truncator
 class _LightweightMessageTruncator:
     def truncate_message_list(self, messages, max_length):
-        # Very simple char-based truncation as a fallback
+        # Very simple char-based truncation as a fallback: find the cut index over
+        # precomputed sizes, then slice once instead of copying message by message
+        sizes = [len(str(m.get("content", ""))) for m in messages]
         total = 0
-        out = []
-        for msg in reversed(messages):
-            content = msg.get("content", "")
-            size = len(str(content))
-            if total + size > max_length:
-                if not out:
-                    # truncate this one
-                    truncated_msg = msg.copy()
-                    text = str(content)
-                    truncated_msg["content"] = text[: max(0, max_length - total)]
-                    out.insert(0, truncated_msg)
+        cut = len(messages)
+        for i in range(len(messages) - 1, -1, -1):
+            if total + sizes[i] > max_length:
                 break
-            out.insert(0, msg)
-            total += size
-        return out
+            total += sizes[i]
+            cut = i
+        if cut >= len(messages) and messages:
+            # newest message alone exceeds the budget - truncate it
+            truncated_msg = messages[-1].copy()
+            truncated_msg["content"] = str(messages[-1].get("content", ""))[: max(0, max_length)]
+            return [truncated_msg]
+        return messages[cut:]
 
 # Single, deterministic MessageTruncator alias - fail fast, no confusion
-if tiktoken is not None:
+if _HAS_TIKTOKEN:
     MessageTruncator = TikTokenMessageTruncator
 else:
     MessageTruncator = _LightweightMessageTruncator
@@ -154,8 +258,10 @@ class LLM(KwargsInitializable):
         # Handle _default_init case (skip validation)
         if kwargs.get('_default_init'):
             self.headers = None
+            self.session = None
+            self._static_payload = {}
             self.call_stat = {}
-            self.message_truncator = TikTokenMessageTruncator()
+            self.message_truncator = get_message_truncator()
             return
 
         # HTTP-only validation - fail fast, no provider abstraction
@@ -177,9 +283,22 @@ class LLM(KwargsInitializable):
             "Authorization": f"Bearer {self.api_key}"
         }
 
+        # Persistent session with keep-alive: a fresh requests.post pays TCP+TLS handshake on every call
+        import requests  # deferred: only actual LLM clients need it
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        _adapter = requests.adapters.HTTPAdapter(pool_connections=16, pool_maxsize=64, max_retries=0)
+        self.session.mount("https://", _adapter)
+        self.session.mount("http://", _adapter)
+
+        # Static part of every payload, merged once here instead of on each call
+        self._static_payload = {"model": self.model}  # Model is separate, not in extract_body
+        if self.extract_body:
+            self._static_payload.update(self.extract_body)
+
         # Stats and truncator
         self.call_stat = {}
-        self.message_truncator = TikTokenMessageTruncator()
+        self.message_truncator = get_message_truncator()
 
     def __repr__(self):
         return f"LLM(target={self.call_target})"
@@ -189,8 +308,8 @@ class LLM(KwargsInitializable):
         func = lambda: self._call_with_messages(messages, extract_body, **kwargs)
         return wrapped_trying(func, max_times=self.max_retry_times, wait_error_names=('RateLimitError',))
 
-    def _call_with_messages(self, messages, extract_body=None, **kwargs):
-        """Execute pure HTTP LLM call - no abstraction, fail fast"""
+    def _build_payload(self, messages, extract_body=None, **kwargs):
+        """Prepare the request payload: images to base64, truncation, merged request params"""
         # Handle uninitialized case
         if not self.headers or not self.call_target:
             raise RuntimeError("LLM not properly initialized - use proper call_target and api_key")
@@ -201,42 +320,35 @@ class LLM(KwargsInitializable):
         # Truncate messages
         messages = self.message_truncator.truncate_message_list(messages, self.max_token_num)
 
-        # Build payload - start with required fields
-        payload = {
-            "model": self.model,  # Model is separate, not in extract_body
-            "messages": messages
-        }
-
-        # Add default extract_body parameters (pure request params only)
-        if self.extract_body:
-            payload.update(self.extract_body)
+        # Build payload from the precomputed static part (model + default extract_body)
+        payload = {**self._static_payload, "messages": messages}
 
         # Add call-specific extract_body parameters (override defaults)
         if extract_body:
             payload.update(extract_body)
 
         # Add any additional kwargs
-        payload.update(kwargs)
+        if kwargs:
+            payload.update(kwargs)
+        return payload
 
-        # Execute HTTP call - direct to call_target
-        response = requests.post(
-            self.call_target,
-            headers=self.headers,
-            json=payload,
-            timeout=self.request_timeout
-        )
+    def _parse_response(self, response, result):
+        """Turn a raw HTTP response into the output content - fail fast on errors
 
+        Takes the response object (requests or httpx) so the body is only decoded
+        to text on the error paths; the success path works from the parsed bytes.
+        """
+        status_code = response.status_code
         # Handle different HTTP status codes appropriately
-        if response.status_code == 429:
+        if status_code == 429:
             # Rate limit exceeded - special handling for retry logic
-            raise RateLimitError(f"HTTP {response.status_code}: {response.text}")
-        elif response.status_code != 200:
+            raise RateLimitError(f"HTTP {status_code}: {response.text}")
+        elif status_code != 200:
             # Other HTTP errors - fail fast
-            raise RuntimeError(f"HTTP {response.status_code}: {response.text}")
+            raise RuntimeError(f"HTTP {status_code}: {response.text}")
 
         # Parse response - fail fast on invalid format
         try:
-            result = response.json()
             message = result["choices"][0]["message"]
 
             # Check for function calls (tool_calls)
@@ -266,8 +378,52 @@ class LLM(KwargsInitializable):
 
         return content
 
+    def _call_with_messages(self, messages, extract_body=None, **kwargs):
+        """Execute pure HTTP LLM call - no abstraction, fail fast"""
+        payload = self._build_payload(messages, extract_body, **kwargs)
+
+        # Execute HTTP call - direct to call_target, reusing the pooled session connection;
+        # serialize ourselves so orjson handles big message histories instead of stdlib json
+        response = self.session.post(
+            self.call_target,
+            data=_json_dumps_bytes(payload),
+            timeout=self.request_timeout
+        )
+        result = _json_loads(response.content) if response.status_code == 200 else None
+        return self._parse_response(response, result)
+
+    async def acall(self, messages, extract_body=None, **kwargs):
+        """Async variant of __call__ over a shared httpx client - lets callers fan out concurrent requests"""
+        payload = self._build_payload(messages, extract_body, **kwargs)
+        client = _get_async_client(self.request_timeout)
+        remaining = self.max_retry_times
+        while True:
+            try:
+                response = await client.post(self.call_target, headers=self.headers,
+                                             content=_json_dumps_bytes(payload))
+                result = _json_loads(response.content) if response.status_code == 200 else None
+                return self._parse_response(response, result)
+            except RateLimitError:
+                if remaining <= 0:
+                    raise
+                remaining -= 1
+                await asyncio.sleep(30)  # mirror wrapped_trying's rate-limit backoff
+
+    async def abatch(self, list_of_message_lists, extract_body=None, concurrency=8, **kwargs):
+        """Run many LLM calls concurrently, bounded by a semaphore to stay under endpoint rate limits"""
+        sem = asyncio.Semaphore(concurrency)
+
+        async def _one(messages):
+            async with sem:
+                return await self.acall(messages, extract_body, **kwargs)
+
+        return await asyncio.gather(*(_one(m) for m in list_of_message_lists))
+
     def _process_images(self, messages):
         """Process images in messages - auto convert to base64 if needed"""
+        # common case is an all-text conversation: nothing to convert, so skip the copying walk
+        if not any(isinstance(m.get("content"), list) for m in messages):
+            return messages
         processed_messages = []
 
         for message in messages:
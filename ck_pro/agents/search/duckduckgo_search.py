@@ -6,6 +6,10 @@ Uses external ddgs library for reliable search functionality
 from typing import List
 from .base import BaseSearchEngine, SearchResult, SearchEngine, SearchEngineError
 
+# one DDGS client for the whole process: each instance sets up its own HTTP/TLS stack,
+# and the factory constructs a fresh engine per create() call
+_DDGS_SINGLETON = None
+
 
 class DuckDuckGoSearchEngine(BaseSearchEngine):
     """DuckDuckGo Search implementation using external ddgs library"""
@@ -16,14 +20,17 @@ class DuckDuckGoSearchEngine(BaseSearchEngine):
         self._initialize_ddgs()
 
     def _initialize_ddgs(self):
-        """Initialize DuckDuckGo search using ddgs library"""
-        try:
-            from ddgs import DDGS
-            self._ddgs = DDGS()
-        except ImportError as e:
-            raise SearchEngineError(
-                "ddgs library not installed. Install with: pip install ddgs>=3.0.0"
-            ) from e
+        """Initialize DuckDuckGo search using the shared ddgs client"""
+        global _DDGS_SINGLETON
+        if _DDGS_SINGLETON is None:
+            try:
+                from ddgs import DDGS
+                _DDGS_SINGLETON = DDGS()
+            except ImportError as e:
+                raise SearchEngineError(
+                    "ddgs library not installed. Install with: pip install ddgs>=3.0.0"
+                ) from e
+        self._ddgs = _DDGS_SINGLETON
 
     @property
     def engine_type(self) -> SearchEngine:
@@ -55,13 +62,18 @@ class DuckDuckGoSearchEngine(BaseSearchEngine):
                 max_results=self.max_results
             )
 
-            # Convert to standardized format
+            # Convert to standardized format; strip/check here and model_construct to
+            # skip per-result pydantic validation in the hot loop
             results = []
             for result in raw_results:
-                search_result = SearchResult(
-                    title=result.get('title', ''),
-                    url=result.get('href', ''),
-                    description=result.get('body', '')
+                title = result.get('title', '').strip()
+                url = result.get('href', '').strip()
+                if not title or not url:
+                    raise ValueError(f"Search result missing title/url: {result}")
+                search_result = SearchResult.model_construct(
+                    title=title,
+                    url=url,
+                    description=result.get('body', '').strip()
                 )
                 results.append(search_result)
 
@@ -3,12 +3,21 @@ Search Engine Factory for CognitiveKernel-Pro
 Strict factory pattern - Let it crash, no fallbacks
 """
 
+import functools
+
 from typing import Dict, Type
 from .base import BaseSearchEngine, SearchEngine, SearchEngineError
 from .google_search import GoogleSearchEngine
 from .duckduckgo_search import DuckDuckGoSearchEngine
 
 
+@functools.lru_cache(maxsize=8)
+def _create_cached(engine_class: Type[BaseSearchEngine], max_results: int) -> BaseSearchEngine:
+    # engines hold only config plus shared network clients, so reusing one per
+    # (class, max_results) is safe and keeps their sessions warm
+    return engine_class(max_results=max_results)
+
+
 class SearchEngineFactory:
     """Factory for creating search engines - STRICT, NO FALLBACKS"""
 
@@ -44,7 +53,7 @@ class SearchEngineFactory:
             raise SearchEngineError(f"No implementation for engine: {engine_type}")
 
         try:
-            return engine_class(max_results=max_results)
+            return _create_cached(engine_class, max_results)
         except Exception as e:
             raise SearchEngineError(f"Failed to create {engine_type.value} search engine: {str(e)}") from e
 
@@ -3,22 +3,33 @@ Google Search Engine implementation for CognitiveKernel-Pro
 Embedded anti-bot bypass techniques from googlesearch library
 """
 
+import importlib.util
 import random
 import time
 from typing import List, Generator
 from urllib.parse import unquote
 from .base import BaseSearchEngine, SearchResult, SearchEngine, SearchEngineError
 
+_HAS_LXML = importlib.util.find_spec("lxml") is not None
+
+_URL_Q = "/url?q="
+
+
+def _clean_result_url(raw_url: str) -> str:
+    """Decode Google's /url?q= redirect in one pass (slice + partition, single unquote)"""
+    if raw_url.startswith(_URL_Q):
+        return unquote(raw_url[len(_URL_Q):].partition("&")[0])
+    return raw_url
+
 try:
     import requests
-    from bs4 import BeautifulSoup
 except ImportError as e:
     raise SearchEngineError(
-        "Required dependencies not installed. Install with: pip install requests beautifulsoup4"
+        "Required dependencies not installed. Install with: pip install requests"
     ) from e
 
 
-def _get_random_user_agent() -> str:
+def _build_user_agent() -> str:
     """Generate random Lynx-based user agent to avoid detection"""
     lynx_version = f"Lynx/{random.randint(2, 3)}.{random.randint(8, 9)}.{random.randint(0, 2)}"
     libwww_version = f"libwww-FM/{random.randint(2, 3)}.{random.randint(13, 15)}"
@@ -27,9 +38,36 @@ def _get_random_user_agent() -> str:
     return f"{lynx_version} {libwww_version} {ssl_mm_version} {openssl_version}"
 
 
+# built once at import: picking from a pool keeps the per-request cost at one random.choice
+# while preserving the same fingerprint diversity
+_UA_POOL = [_build_user_agent() for _ in range(64)]
+
+
+def _get_random_user_agent() -> str:
+    """Pick a random precomputed user agent"""
+    return random.choice(_UA_POOL)
+
+
+_GOOGLE_SESSION = None
+
+
+def _get_google_session() -> "requests.Session":
+    """Shared session with pooled connections so repeated queries reuse the TLS handshake"""
+    global _GOOGLE_SESSION
+    if _GOOGLE_SESSION is None:
+        session = requests.Session()
+        session.cookies.update({
+            'CONSENT': 'PENDING+987',  # Bypasses Google consent page
+            'SOCS': 'CAESHAgBEhIaAB',   # Additional consent bypass
+        })
+        session.mount("https://", requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=8))
+        _GOOGLE_SESSION = session
+    return _GOOGLE_SESSION
+
+
 def _google_search_request(query: str, num_results: int, timeout: int = 10) -> requests.Response:
     """Make Google search request with anti-bot protection"""
-    response = requests.get(
+    response = _get_google_session().get(
         url="https://www.google.com/search",
         headers={
             "User-Agent": _get_random_user_agent(),
@@ -44,17 +82,58 @@ def _google_search_request(query: str, num_results: int, timeout: int = 10) -> r
         },
         timeout=timeout,
         verify=True,
-        cookies={
-            'CONSENT': 'PENDING+987',  # Bypasses Google consent page
-            'SOCS': 'CAESHAgBEhIaAB',   # Additional consent bypass
-        }
     )
     response.raise_for_status()
     return response
 
 
-def _parse_google_results(html: str) -> Generator[SearchResult, None, None]:
-    """Parse Google search results from HTML using precise CSS selectors"""
+# XPath equivalents of the CSS class selectors below (lxml fast path, no cssselect needed)
+_XP_RESULT = '//div[contains(concat(" ", normalize-space(@class), " "), " ezO2md ")]'
+_XP_LINK = './/a[@href]'
+_XP_TITLE = './/span[contains(concat(" ", normalize-space(@class), " "), " CVA68e ")]'
+_XP_DESC = './/span[contains(concat(" ", normalize-space(@class), " "), " FrIlee ")]'
+
+
+def _parse_google_results_lxml(html) -> Generator[SearchResult, None, None]:
+    """Parse Google search results with lxml's C parser - much faster than html.parser"""
+    import lxml.html
+    if isinstance(html, bytes):
+        # Google serves UTF-8; decide it here instead of letting lxml guess latin-1
+        parser = lxml.html.HTMLParser(encoding="utf-8")
+        tree = lxml.html.fromstring(html, parser=parser)
+    else:
+        tree = lxml.html.fromstring(html)
+    for result in tree.xpath(_XP_RESULT):
+        links = result.xpath(_XP_LINK)
+        if not links:
+            continue
+        link_tag = links[0]
+        titles = link_tag.xpath(_XP_TITLE)
+        if not titles:
+            continue
+        descriptions = result.xpath(_XP_DESC)
+
+        # Clean and decode URL
+        url = _clean_result_url(link_tag.get("href"))
+
+        title = "".join(titles[0].itertext()).strip() or "No title"
+        description = "".join(descriptions[0].itertext()).strip() if descriptions else "No description"
+
+        # fields are already stripped and non-empty here, so skip pydantic validation
+        yield SearchResult.model_construct(title=title, url=url, description=description)
+
+
+def _parse_google_results(html) -> Generator[SearchResult, None, None]:
+    """Parse Google search results from HTML (str or bytes) using precise CSS selectors"""
+    if _HAS_LXML:
+        yield from _parse_google_results_lxml(html)
+        return
+    try:
+        from bs4 import BeautifulSoup  # deferred: DuckDuckGo-only deployments never parse SERPs
+    except ImportError as e:
+        raise SearchEngineError(
+            "Required dependencies not installed. Install with: pip install beautifulsoup4"
+        ) from e
     soup = BeautifulSoup(html, "html.parser")
     result_blocks = soup.find_all("div", class_="ezO2md")  # Precise Google result selector
 
@@ -72,16 +151,13 @@ def _parse_google_results(html: str) -> Generator[SearchResult, None, None]:
 
         if link_tag and title_tag:
             # Clean and decode URL
-            raw_url = link_tag["href"]
-            if raw_url.startswith("/url?q="):
-                url = unquote(raw_url.split("&")[0].replace("/url?q=", ""))
-            else:
-                url = raw_url
+            url = _clean_result_url(link_tag["href"])
 
             title = title_tag.text.strip() if title_tag else "No title"
             description = description_tag.text.strip() if description_tag else "No description"
 
-            yield SearchResult(title=title, url=url, description=description)
+            # fields are already stripped and non-empty here, so skip pydantic validation
+            yield SearchResult.model_construct(title=title, url=url, description=description)
 
 
 class GoogleSearchEngine(BaseSearchEngine):
@@ -119,8 +195,9 @@ class GoogleSearchEngine(BaseSearchEngine):
                 timeout=10
             )
 
-            # Parse results using precise CSS selectors
-            results = list(_parse_google_results(response.text))
+            # Parse results using precise CSS selectors; pass raw bytes so the
+            # parser handles decoding and requests skips its charset detection
+            results = list(_parse_google_results(response.content))
 
             # Limit to requested number of results
             limited_results = results[:self.max_results]
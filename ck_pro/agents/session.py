@@ -3,21 +3,53 @@
 # a session of one task running
 
 __all__ = [
-    "AgentSession",
+    "AgentSession", "AsyncSessionWriter",
 ]
 
+import json
+import queue
+import threading
+
 from .utils import get_unique_id
 
+# background JSONL writer: the agent loop enqueues records and never blocks on disk
+class AsyncSessionWriter:
+    def __init__(self, path):
+        self.path = path
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._drain, daemon=True, name="session_writer")
+        self._thread.start()
+
+    def put(self, record: dict):
+        self._queue.put(record)
+
+    def _drain(self):
+        with open(self.path, "a", encoding="utf-8") as fd:
+            while True:
+                record = self._queue.get()
+                if record is None:  # close sentinel
+                    break
+                fd.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+                fd.flush()
+
+    def close(self, timeout=5):
+        self._queue.put(None)
+        self._thread.join(timeout=timeout)
+
 class AgentSession:
-    def __init__(self, id=None, task="", **kwargs):
+    def __init__(self, id=None, task="", archive_path=None, **kwargs):
         self.id = id if id is not None else get_unique_id("S")
         self.info = {}
         self.info.update(kwargs)
+        self.archive_path = archive_path  # optional JSONL file receiving compacted-away step IO
         self.task = task  # target task
         self.steps = []  # a list of dicts to indicate each step's running, simply use dict to max flexibility
+        self.tool_cache = {}  # per-session memoization of side-effect-free tool calls (not serialized)
 
     def to_dict(self):
-        return self.__dict__.copy()
+        ret = self.__dict__.copy()
+        ret.pop("tool_cache", None)  # runtime-only cache
+        return ret
 
     def from_dict(self, data: dict):
         for k, v in data.items():
@@ -55,3 +87,21 @@ class AgentSession:
 
     def add_step(self, step_info):
         self.steps.append(step_info)
+
+    def compact(self, keep_recent=0):
+        # drop heavy llm_input/llm_output blobs from steps older than keep_recent to bound memory;
+        # dropped pieces are appended to archive_path (JSONL) if one is configured
+        _end = len(self.steps) - max(0, keep_recent)
+        archived = []
+        for ss in self.steps[:_end]:
+            for _sec in ("plan", "action", "end"):
+                _sec_d = ss.get(_sec)
+                if isinstance(_sec_d, dict):
+                    _dropped = {k: _sec_d.pop(k) for k in ("llm_input", "llm_output") if k in _sec_d}
+                    if _dropped:
+                        archived.append({"session_id": self.id, "step_idx": ss.get("step_idx"), "section": _sec, **_dropped})
+        if archived and self.archive_path:
+            with open(self.archive_path, "a", encoding="utf-8") as fd:
+                for one in archived:
+                    fd.write(json.dumps(one, ensure_ascii=False, default=str) + "\n")
+        return len(archived)
@@ -1,10 +1,44 @@
 #
 
+import threading
+import time
+from collections import OrderedDict
+
 from .utils import KwargsInitializable, rprint
 
+
+class QueryResultCache:
+    """Process-wide LRU with TTL for tools that are pure remote calls (search, ask_llm).
+
+    Agent loops re-issue identical queries across steps and sessions; an exact-match
+    hit skips a whole HTTP/LLM round trip. Keys are normalized query strings.
+    """
+    def __init__(self, maxsize=256, ttl=300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expire_time, value)
+
+    def get(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expire_time, value = entry
+        if time.monotonic() >= expire_time:
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
 class Tool(KwargsInitializable):
     def __init__(self, **kwargs):
         self.name = ""
+        self.stateful = False  # tools with side effects set this True to opt out of per-session memoization
         super().__init__(**kwargs)
 
     def get_function_definition(self, short: bool):
@@ -20,15 +54,9 @@ class StopResult(dict):
     pass
 
 class StopTool(Tool):
-    def __init__(self, agent=None):
-        super().__init__(name="stop")
-        self.agent = agent
-
-    def get_function_definition(self, short: bool):
-        if short:
-            return """- def stop(output: str, log: str) -> Dict:  # Finalize and formalize the answer when the task is complete."""
-        else:
-            return """- stop
+    # definition strings are constants: keep them class-level so prompt building never rebuilds them
+    _SHORT_DEF = """- def stop(output: str, log: str) -> Dict:  # Finalize and formalize the answer when the task is complete."""
+    _LONG_DEF = """- stop
 ```python
 def stop(output: str, log: str) -> dict:
     \""" Finalize and formalize the answer when the task is complete.
@@ -47,6 +75,13 @@ def stop(output: str, log: str) -> dict:
     \"""
 ```"""
 
+    def __init__(self, agent=None):
+        super().__init__(name="stop", stateful=True)  # puts the final result: never memoize
+        self.agent = agent
+
+    def get_function_definition(self, short: bool):
+        return self._SHORT_DEF if short else self._LONG_DEF
+
     def __call__(self, output: str, log: str):
         ret = StopResult(output=output, log=log)
         if self.agent is not None:
@@ -54,18 +89,8 @@ def stop(output: str, log: str) -> dict:
         return ret
 
 class AskLLMTool(Tool):
-    def __init__(self, llm=None):
-        super().__init__(name="ask_llm")
-        self.llm = llm
-
-    def set_llm(self, llm):
-        self.llm = llm
-
-    def get_function_definition(self, short: bool):
-        if short:
-            return """- def ask_llm(query: str) -> str:  # Directly query the language model for tasks that do not require external tools."""
-        else:
-            return """- ask_llm
+    _SHORT_DEF = """- def ask_llm(query: str) -> str:  # Directly query the language model for tasks that do not require external tools."""
+    _LONG_DEF = """- ask_llm
 ```python
 def ask_llm(query: str) -> str:
     \""" Directly query the language model for tasks that do not require external tools.
@@ -82,11 +107,34 @@ def ask_llm(query: str) -> str:
     \"""
 ```"""
 
+    def __init__(self, llm=None):
+        super().__init__(name="ask_llm")
+        self.llm = llm
+        self.result_cache = QueryResultCache()
+        self._inflight = threading.Semaphore(8)  # bound concurrent backend calls under parallel_map fan-out
+
+    def set_llm(self, llm):
+        self.llm = llm
+
+    def get_function_definition(self, short: bool):
+        return self._SHORT_DEF if short else self._LONG_DEF
+
     def __call__(self, query: str):
+        _cache_key = query.strip().lower()
+        cached = self.result_cache.get(_cache_key)
+        if cached is not None:
+            return cached
         messages = [{"role": "system", "content": "You are a helpful assistant. Answer the user's query with your internal knowledge. Ensure to follow the required output format if specified."}, {"role": "user", "content": query}]
-        response = self.llm(messages)
+        with self._inflight:  # blocking acquire = back-pressure instead of an unbounded queue
+            response = self.llm(messages)
+        self.result_cache.put(_cache_key, response)
         return response
 
+def _esc(s: str) -> str:
+    """Minimal escape for embedding result fields in quoted output (cheaper than repr on long snippets)"""
+    return s.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
 class SimpleSearchTool(Tool):
     """
     Simple web search tool for CognitiveKernel-Pro
@@ -119,6 +167,25 @@ class SimpleSearchTool(Tool):
         # Perform search
         results = tool("Python programming")
     """
+    _SHORT_DEF = """- def simple_web_search(query: str) -> str:  # Perform a quick web search using a search engine for straightforward information needs."""
+    _LONG_DEF = """- simple_web_search
+```python
+def simple_web_search(query: str) -> str:
+    \""" Perform a quick web search using a search engine for straightforward information needs.
+    Args:
+        query (str): A simple, well-phrased search term or question.
+    Returns:
+        str: A string containing search results, including titles, URLs, and snippets.
+    Notes:
+        - Use for quick lookups or when you need up-to-date information.
+        - Avoid complex or multi-step queries; keep the query simple and direct.
+        - Do not use for tasks requiring deep reasoning or multi-source synthesis.
+    Examples:
+        >>> answer = simple_web_search(query="latest iPhone")
+        >>> print(answer)
+    \"""
+```"""
+
     def __init__(self, llm=None, max_results=7, list_enum=True, backend=None, **kwargs):
         super().__init__(name="simple_web_search")
         self.llm = llm
@@ -126,7 +193,9 @@ class SimpleSearchTool(Tool):
         self.list_enum = list_enum
         self.backend = backend  # None means use configured default
         self.search_engine = None
-        self._initialize_search_engine()
+        self.result_cache = QueryResultCache()
+        self._inflight = threading.Semaphore(8)  # bound concurrent backend calls under parallel_map fan-out
+        # engine built lazily on first search: keeps the backend imports off CKAgent startup
         # --
 
     def _initialize_search_engine(self):
@@ -161,48 +230,31 @@ class SimpleSearchTool(Tool):
         self.llm = llm  # might be useful for formatting?
 
     def get_function_definition(self, short: bool):
-            if short:
-                return """- def simple_web_search(query: str) -> str:  # Perform a quick web search using a search engine for straightforward information needs."""
-            else:
-                return """- simple_web_search
-```python
-def simple_web_search(query: str) -> str:
-    \""" Perform a quick web search using a search engine for straightforward information needs.
-    Args:
-        query (str): A simple, well-phrased search term or question.
-    Returns:
-        str: A string containing search results, including titles, URLs, and snippets.
-    Notes:
-        - Use for quick lookups or when you need up-to-date information.
-        - Avoid complex or multi-step queries; keep the query simple and direct.
-        - Do not use for tasks requiring deep reasoning or multi-source synthesis.
-    Examples:
-        >>> answer = simple_web_search(query="latest iPhone")
-        >>> print(answer)
-    \"""
-```"""
+        return self._SHORT_DEF if short else self._LONG_DEF
 
     def __call__(self, query: str):
         """Execute search - LET IT CRASH if there are issues"""
-        if not self.search_engine:
-            raise RuntimeError("Search engine not initialized. This should not happen.")
+        if self.search_engine is None:
+            self._initialize_search_engine()  # strict-crash semantics, just deferred to first use
+
+        _cache_key = query.strip().lower()
+        cached = self.result_cache.get(_cache_key)
+        if cached is not None:
+            return cached
 
         # Use the new search engine interface - let exceptions propagate
-        results = self.search_engine.search(query)
-
-        # Convert to the expected format
-        search_results = []
-        for result in results:
-            search_results.append({
-                "title": result.title,
-                "link": result.url,
-                "content": result.description
-            })
-
-        if len(search_results) == 0:
+        with self._inflight:  # blocking acquire = back-pressure instead of an unbounded queue
+            results = self.search_engine.search(query)
+
+        # Format in a single pass over the results - no intermediate dict list
+        if self.list_enum:
+            lines = [f'({ii}) title="{_esc(vv.title)}", link="{_esc(vv.url)}", content="{_esc(vv.description)}"' for ii, vv in enumerate(results)]
+        else:
+            lines = [f'- title="{_esc(vv.title)}", link="{_esc(vv.url)}", content="{_esc(vv.description)}"' for vv in results]
+
+        if not lines:
             ret = "Search Results: No results found! Try a less restrictive/simpler query."
-        elif self.list_enum:
-            ret = "Search Results:\n" + "\n".join([f"({ii}) title={repr(vv['title'])}, link={repr(vv['link'])}, content={repr(vv['content'])}" for ii, vv in enumerate(search_results)])
         else:
-            ret = "Search Results:\n" + "\n".join([f"- title={repr(vv['title'])}, link={repr(vv['link'])}, content={repr(vv['content'])}" for ii, vv in enumerate(search_results)])
+            ret = "Search Results:\n" + "\n".join(lines)
+        self.result_cache.put(_cache_key, ret)
         return ret
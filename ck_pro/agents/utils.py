@@ -8,6 +8,7 @@ import sys
 import json
 import types
 import contextlib
+from collections.abc import MutableMapping
 from typing import Union, Callable
 from functools import partial
 import signal
@@ -115,13 +116,25 @@ class KwargsInitializable:
 class TemplatedString:
     def __init__(self, s: Union[str, Callable]):
         self.str = s
+        self._compiled = None
+        if isinstance(s, str):  # compile the f-string once instead of re-parsing on every format
+            assert '"""' not in s, "Special seq not allowed!"
+            self._compiled = compile('f"""'+s+'"""', "<template>", "eval")
 
     def format(self, **kwargs):
+        if self._compiled is not None:
+            return eval(self._compiled, None, dict(kwargs))
         if isinstance(self.str, str):
             return TemplatedString.eval_fstring(self.str, **kwargs)
         else:  # direct call it!
             return self.str(**kwargs)
 
+    def format_map(self, mapping):
+        # like format but without **-expansion: with a LazyKwargs mapping only referenced keys are materialized
+        if self._compiled is not None:
+            return eval(self._compiled, None, mapping)
+        return self.format(**dict(mapping))
+
     @staticmethod
     def eval_fstring(s: str, _globals=None, _locals=None, **kwargs):
         if _locals is None:
@@ -133,6 +146,49 @@ class TemplatedString:
         ret = eval('f"""'+s+'"""', _globals, _inner_locals)
         return ret
 
+# a mapping whose values can be zero-arg thunks, materialized (and memoized) on first access;
+# heavy prompt pieces registered via set_lazy are never built if the template does not reference them
+class LazyKwargs(MutableMapping):
+    def __init__(self, base=None):
+        self._data = dict(base) if base else {}
+        self._thunks = {}
+
+    def set_lazy(self, key, fn: Callable):
+        memo = []  # shared through copy(): the underlying builder runs at most once overall
+        def _thunk():
+            if not memo:
+                memo.append(fn())
+            return memo[0]
+        self._data.pop(key, None)
+        self._thunks[key] = _thunk
+
+    def __getitem__(self, key):
+        if key not in self._data and key in self._thunks:
+            self._data[key] = self._thunks.pop(key)()
+        return self._data[key]
+
+    def __setitem__(self, key, value):
+        self._thunks.pop(key, None)
+        self._data[key] = value
+
+    def __delitem__(self, key):
+        if key in self._thunks:
+            del self._thunks[key]
+        else:
+            del self._data[key]
+
+    def __iter__(self):
+        yield from self._data
+        yield from self._thunks
+
+    def __len__(self):
+        return len(self._data) + len(self._thunks)
+
+    def copy(self):
+        ret = LazyKwargs(self._data)
+        ret._thunks.update(self._thunks)  # still-unmaterialized thunks are shared
+        return ret
+
 # a simple wrapper class for with expression
 class WithWrapper:
     def __init__(self, f_start: Callable = None, f_end: Callable = None, item=None):
@@ -202,24 +258,25 @@ def incr_update_dict(trg, src_dict):
 def parse_response(s: str, seps: list, strip=True, return_dict=False):
     assert len(seps) == len(set(seps)), f"Repeated items in seps: {seps}"
     ret = []
-    remaining_s = s
-    # parse them one by one
+    # parse them one by one: track offsets into s instead of slicing off big intermediate strings
+    remaining_start = 0
     for one_sep_idx, one_sep in enumerate(seps):
-        try:
-            p1, p2 = remaining_s.split(one_sep, 1)
-            if p1.strip():
-                rprint(f"Get an unexpected piece: {p1}")
-            sep_val = p2
-            for one_sep2 in seps[one_sep_idx+1:]:
-                if one_sep2 in p2:
-                    sep_val = p2.split(one_sep2, 1)[0]
-                    break  # finding one is enough!
-            assert p2.startswith(sep_val), "Internal error for unmatched prefix??"
-            remaining_s = p2[len(sep_val):]
-            one_val = sep_val
-        except:  # by default None
-            one_val = None
-        ret.append(one_val)
+        _idx = s.find(one_sep, remaining_start)
+        if _idx < 0:  # by default None
+            ret.append(None)
+            continue
+        p1 = s[remaining_start:_idx]
+        if p1.strip():
+            rprint(f"Get an unexpected piece: {p1}")
+        _val_start = _idx + len(one_sep)
+        _val_end = len(s)
+        for one_sep2 in seps[one_sep_idx+1:]:
+            _idx2 = s.find(one_sep2, _val_start)
+            if _idx2 >= 0:
+                _val_end = _idx2
+                break  # finding one is enough!
+        ret.append(s[_val_start:_val_end])
+        remaining_start = _val_end
     # --
     if strip:
         if isinstance(strip, str):
@@ -148,7 +148,7 @@ def file_agent(task: str, file_path_dict: dict = None) -> dict:
 
     def step_action(self, action_res, action_input_kwargs, file_env=None, **kwargs):
         action_res["file_state_before"] = file_env.get_state()  # inplace storage of the web-state before the action
-        _rr = super().step_action(action_res, action_input_kwargs)  # get action from code execution
+        _rr = super().step_action(action_res, action_input_kwargs, **kwargs)  # get action from code execution
         if isinstance(_rr, ActionResult):
             action_str, action_result = _rr.action, _rr.result
         else:
@@ -7,7 +7,9 @@ Clean, type-safe prompt building following Linus Torvalds' engineering principle
 - Fail fast with proper validation
 - Zero technical debt
 """
+import functools
 from dataclasses import dataclass, field
+from itertools import chain, repeat
 from enum import Enum
 from typing import List, Dict, Any, Optional, Union
 from pathlib import Path
@@ -31,7 +33,12 @@ class ActionType(Enum):
     @classmethod
     def is_valid(cls, action: str) -> bool:
         """Check if action is valid"""
-        return action in [item.value for item in cls]
+        return action in _ACTION_VALUES
+
+
+# precomputed once: set membership instead of rebuilding the value list per check
+# (kept outside the class body so Enum does not treat it as a member)
+_ACTION_VALUES = frozenset(item.value for item in ActionType)
 
 
 @dataclass
@@ -60,7 +67,7 @@ class FileActionResult:
         }
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class FilePromptConfig:
     """Configuration for file prompt generation"""
     max_file_read_tokens: int = 4000
@@ -166,6 +173,15 @@ class FilePromptBuilder:
             PromptType.ACTION: ACTION_SYSTEM_TEMPLATE,
             PromptType.END: END_SYSTEM_TEMPLATE
         }
+        # config is immutable after init, so render the template variables once here
+        # instead of re-scanning the full template text on every message pair
+        self._rendered_templates = {
+            k: self._replace_template_vars(v) for k, v in self._templates.items()
+        }
+        # image parts re-emitted across plan/action builds within a step: cache the
+        # assembled dicts so megabyte-scale base64 data URLs are not re-copied each time
+        self._img_cache: Dict[Any, Dict[str, Any]] = {}
+        self._img_cache_maxsize = 32
 
     def build_plan_prompt(
         self,
@@ -252,21 +268,21 @@ class FilePromptBuilder:
         prompt_type: PromptType
     ) -> str:
         """Build user content for plan/action prompts"""
-        sections = [
-            f"## Target Task\n{task}\n",
-            f"## Recent Steps\n{recent_steps}\n",
-            f"## Progress State\n{progress_state}\n",
-            f"## File Metadata\n{file_metadata}\n",
-            f"## Current Content\n{textual_content}\n",
+        # single fused f-string: no intermediate section list/join per prompt build
+        body = (
+            f"## Target Task\n{task}\n\n"
+            f"## Recent Steps\n{recent_steps}\n\n"
+            f"## Progress State\n{progress_state}\n\n"
+            f"## File Metadata\n{file_metadata}\n\n"
+            f"## Current Content\n{textual_content}\n\n"
             f"## Target Task (Repeated)\n{task}\n"
-        ]
+        )
 
         if prompt_type == PromptType.PLAN:
-            sections.append(self._get_plan_output_format())
+            return body + "\n" + self._get_plan_output_format()
         elif prompt_type == PromptType.ACTION:
-            sections.append(self._get_action_output_format())
-
-        return "\n".join(sections)
+            return body + "\n" + self._get_action_output_format()
+        return body
 
     def _build_end_user_content(
         self,
@@ -278,18 +294,15 @@ class FilePromptBuilder:
         stop_reason: str
     ) -> str:
         """Build user content for end prompt"""
-        sections = [
-            f"## Target Task\n{task}\n",
-            f"## Recent Steps\n{recent_steps}\n",
-            f"## Progress State\n{progress_state}\n",
-            f"## Current Content\n{textual_content}\n",
-            f"## Final Step\n{current_step}\n",
-            f"## Stop Reason\n{stop_reason}\n",
-            f"## Target Task (Repeated)\n{task}\n",
-            self._get_end_output_format()
-        ]
-
-        return "\n".join(sections)
+        return (
+            f"## Target Task\n{task}\n\n"
+            f"## Recent Steps\n{recent_steps}\n\n"
+            f"## Progress State\n{progress_state}\n\n"
+            f"## Current Content\n{textual_content}\n\n"
+            f"## Final Step\n{current_step}\n\n"
+            f"## Stop Reason\n{stop_reason}\n\n"
+            f"## Target Task (Repeated)\n{task}\n\n"
+        ) + self._get_end_output_format()
 
     def _create_message_pair(
         self,
@@ -299,20 +312,18 @@ class FilePromptBuilder:
         image_suffix: Optional[List[str]] = None
     ) -> List[Dict[str, Any]]:
         """Create system/user message pair"""
-        system_template = self._replace_template_vars(self._templates[prompt_type])
+        system_template = self._rendered_templates[prompt_type]
 
-        messages = [
-            {"role": "system", "content": system_template},
-            {"role": "user", "content": user_content}
-        ]
-
-        # Add visual content if provided
+        # build the user content exactly once - no build-then-overwrite
         if visual_content:
-            messages[1]["content"] = self._add_visual_content(
-                user_content, visual_content, image_suffix
-            )
+            content = self._add_visual_content(user_content, visual_content, image_suffix)
+        else:
+            content = user_content
 
-        return messages
+        return [
+            {"role": "system", "content": system_template},
+            {"role": "user", "content": content}
+        ]
 
     def _replace_template_vars(self, template: str) -> str:
         """Replace template variables with config values"""
@@ -329,20 +340,30 @@ class FilePromptBuilder:
         image_suffix: Optional[List[str]] = None
     ) -> List[Dict[str, Any]]:
         """Add visual content to message"""
-        if not image_suffix:
-            image_suffix = ["png"] * len(visual_content)
-        elif len(image_suffix) < len(visual_content):
-            image_suffix.extend(["png"] * (len(visual_content) - len(image_suffix)))
+        # pad missing suffixes with "png" lazily - no list allocation, no caller-visible mutation
+        suffixes = chain(image_suffix or (), repeat("png"))
 
+        # the screenshot header is its own part: avoids copying the (large) prompt body
+        # just to append a constant suffix
         content_parts = [
-            {"type": "text", "text": text_content + "\n\n## Screenshot of current pages"}
+            {"type": "text", "text": text_content},
+            {"type": "text", "text": "## Screenshot of current pages"},
         ]
 
-        for suffix, img_data in zip(image_suffix, visual_content):
-            content_parts.append({
-                "type": "image_url",
-                "image_url": {"url": f"data:image/{suffix};base64,{img_data}"}
-            })
+        for suffix, img_data in zip(suffixes, visual_content):
+            # keyed by the data string itself (str hashes are cached), not id(): object
+            # ids get reused after garbage collection and would alias wrong images
+            _key = (suffix, img_data)
+            part = self._img_cache.get(_key)
+            if part is None:
+                part = {
+                    "type": "image_url",
+                    "image_url": {"url": f"data:image/{suffix};base64,{img_data}"}
+                }
+                if len(self._img_cache) >= self._img_cache_maxsize:
+                    self._img_cache.clear()  # simple bound; entries are per-step anyway
+                self._img_cache[_key] = part
+            content_parts.append(part)
 
         return content_parts
 
@@ -376,11 +397,13 @@ Code: {Output Python dict with final result. Wrap with "```python ```" marks.}
 
 
 # Backward compatibility interface - clean migration path
+@functools.lru_cache(maxsize=8)
 def create_prompt_builder(
     max_file_read_tokens: int = 4000,
     max_file_screenshots: int = 5
 ) -> FilePromptBuilder:
-    """Factory function for creating prompt builder"""
+    """Factory function for creating prompt builder (memoized: builders are stateless
+    after init, so the per-step wrappers reuse one instance per config)"""
     config = FilePromptConfig(
         max_file_read_tokens=max_file_read_tokens,
         max_file_screenshots=max_file_screenshots
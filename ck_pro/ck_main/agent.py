@@ -1,4 +1,6 @@
 #
+import asyncio
+import threading
 import time
 import re
 import random
@@ -17,8 +19,9 @@ class CKAgent(MultiStepAgent):
         # note: this is a little tricky since things will get re-init again in super().__init__
         # Initialize search_backend attribute for KwargsInitializable
         self.search_backend = None
-        # Dedicated single-thread executor for action code to ensure thread-affinity
-        self._action_executor = None
+        # Dedicated background event loop for action code to ensure thread-affinity
+        self._action_loop = None
+        self._action_thread = None
 
         # Store settings reference
         self.settings = settings
@@ -90,32 +93,32 @@ class CKAgent(MultiStepAgent):
         raise RuntimeError("Should NOT use CKAgent as a sub-agent!")
 
     def _ensure_action_executor(self):
-        if self._action_executor is None:
-            from concurrent.futures import ThreadPoolExecutor
-            # Single dedicated worker thread to keep Playwright and sub-agents in one thread
-            self._action_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ck_action")
-
-    def step_action(self, action_res, action_input_kwargs, **kwargs):
-        """Execute single action step in a dedicated thread (to avoid asyncio-loop conflicts)."""
+        if self._action_loop is None:
+            # Single dedicated thread running its own event loop: keeps Playwright and
+            # sub-agents on one thread while letting them await coroutines natively
+            self._action_loop = asyncio.new_event_loop()
+            self._action_thread = threading.Thread(
+                target=self._action_loop.run_forever, daemon=True, name="ck_action")
+            self._action_thread.start()
+
+    def step_action(self, action_res, action_input_kwargs, session=None, **kwargs):
+        """Execute single action step on the dedicated loop thread (to avoid asyncio-loop conflicts)."""
         self._ensure_action_executor()
 
-        def _do_execute():
-            python_executor = CodeExecutor()
-            python_executor.add_global_vars(**self.ACTIVE_FUNCTIONS)
-            _exec_timeout = self.exec_timeout_with_call if any((z in action_res["code"]) for z in self.sub_agent_names) else self.exec_timeout_wo_call
-            python_executor.run(action_res["code"], catch_exception=True, timeout=_exec_timeout)
-            ret = python_executor.get_print_results()
-            rprint(f"Obtain action res = {ret}", style="white on yellow")
-            return ret
-
-        # Run user action code on the dedicated worker thread and wait for completion
-        future = self._action_executor.submit(_do_execute)
+        async def _do_execute():
+            return self._run_action_code(action_res, session=session)
+
+        # Run user action code on the dedicated loop thread and wait for completion
+        future = asyncio.run_coroutine_threadsafe(_do_execute(), self._action_loop)
         return future.result()
 
     def end_run(self, session):
         ret = super().end_run(session)
-        # Cleanly shutdown the dedicated action executor to release resources
-        if self._action_executor is not None:
-            self._action_executor.shutdown(wait=True)
-            self._action_executor = None
+        # Cleanly shutdown the dedicated action loop to release resources
+        if self._action_loop is not None:
+            self._action_loop.call_soon_threadsafe(self._action_loop.stop)
+            self._action_thread.join(timeout=5)
+            self._action_loop.close()
+            self._action_loop = None
+            self._action_thread = None
         return ret
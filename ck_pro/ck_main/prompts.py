@@ -84,6 +84,7 @@ _CK_ACTION_SYS = """You are a strategic assistant responsible for the action mod
 5. **Python Environment**: Explicitly import any libraries you need, including standard ones such as `os` or `sys`, as nothing (except for the pre-defined sub-agents and tools) is imported by default. You do NOT have sudo privileges, so avoid any commands or operations requiring elevated permissions.
 6. **Working Directory**: Use the current folder as your working directory for reading from or writing to files.
 7. **Complexity Control**: Keep your code straightforward and avoid unnecessary complexity, especially when calling tools or sub-agents. Write code that is easy to follow and less prone to errors or exceptions.
+8. **Parallel Calls**: When you need several INDEPENDENT calls of the same tool (e.g., multiple searches), use `parallel_map(fn, items)` to run them concurrently, e.g., `results = parallel_map(simple_web_search, [query1, query2])`. For INDEPENDENT calls of DIFFERENT tools in one step, use `parallel_call(calls)` with a list of `(fn, args)` pairs, e.g., `r1, r2 = parallel_call([(simple_web_search, ("query",)), (ask_llm, ("question",))])`. Results are returned in input order. Do NOT use either for calls that depend on each other's outputs.
 """ + _CK_STRATEGY + """
 ## Example
 ### Task:
@@ -1,12 +1,25 @@
 #
 
+import functools
+import hashlib
+import logging
+import importlib.util
 import os
 import re
 import shutil
-import urllib.request
+import socket
+import time
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+from collections import OrderedDict
 from contextlib import contextmanager
 from concurrent.futures import ThreadPoolExecutor
 
+_HAS_AHOCORASICK = importlib.util.find_spec("ahocorasick") is not None  # optional fast multi-pattern scan
+
+# [^']* instead of greedy .* keeps the match within one quoted text and avoids backtracking on long lines
+_AX_RE = re.compile(r"(?:StaticText|link)\s+'([^']*)'")
+
 from ..agents.agent import MultiStepAgent, register_template, ActionResult
 from ..agents.model import LLM
 from ..agents.utils import zwarn, rprint, have_images_in_messages
@@ -58,25 +71,38 @@ class ThreadedWebEnv:
     def sync_files(self):
         return self._call("sync_files")
 
+    def step_full(self, action_string: str):
+        """Run get_state + step_state + sync_files + get_state as one worker-thread hop,
+        returning (state_before, step_result, state_after). An action step otherwise pays
+        four submit().result() round trips."""
+        def _invoke():
+            env = self._env
+            state_before = env.get_state()
+            step_result = env.step_state(action_string)
+            env.sync_files()
+            return state_before, step_result, env.get_state()
+        return self._executor.submit(_invoke).result()
+
     def stop(self):
-        # Cleanup the underlying env on its own thread, then shutdown the executor
+        # Cleanup the underlying env on its own thread; session close does not block on
+        # browser teardown (the submitted cleanup still runs before the executor exits)
         def _cleanup():
             env = self._env
-            if env is not None:
+            self._env = None
+            if env is None:
+                return
+            try:
+                env.stop()
+            except Exception:
+                pass
+            bp = getattr(env, "browser_pool", None)
+            if bp:
                 try:
-                    env.stop()
-                finally:
-                    bp = getattr(env, "browser_pool", None)
-                    if bp:
-                        try:
-                            bp.stop()
-                        finally:
-                            pass
-                self._env = None
-        try:
-            self._executor.submit(_cleanup).result()
-        finally:
-            self._executor.shutdown(wait=True)
+                    bp.stop()
+                except Exception:
+                    pass
+        self._executor.submit(_cleanup)
+        self._executor.shutdown(wait=False)
 
 # def web_stop(answer, summary): return ActionResult(f"stop [{answer}] ({summary})")  # use self-defined function!
 # --
@@ -97,13 +123,15 @@ class WebAgent(MultiStepAgent):
         self.check_nodiff_steps = 3  # if for 3 steps, we have the same web page, then explicitly indicating this!
         self.html_md_budget = 0  # budget in bytes (around 4 bytes per token, for example: 2K bytes ~ 500 tokens; 0 means not using this)
         self.use_multimodal = "auto"  # no: always no, yes: always yes, auto: let the agent decide
-        # Use same model config as main model for multimodal (if provided); otherwise lazy init
-        multimodal_kwargs = kwargs.get('model', {}).copy() if kwargs.get('model') else None
-        if multimodal_kwargs:
-            self.model_multimodal = LLM(**multimodal_kwargs)
-        else:
-            # Lazy/default init to avoid validation errors when not needed
-            self.model_multimodal = LLM(_default_init=True)
+        self._mm_cache = OrderedDict()  # content-hash -> interned screenshot string (LRU)
+        self._mm_cache_maxsize = 16
+        self._web_ip_probe = None  # (checked_at, web_ip, ok): cached connectivity probe
+        self._page_cache = OrderedDict()  # content-key -> prepared page dict (LRU)
+        self._page_cache_maxsize = 8
+        self._dl_session = None  # lazily-created requests.Session reused across _my_save downloads
+        # Use same model config as main model for multimodal (if provided); built lazily on
+        # first multimodal step_call so text-only sessions never pay for the second client
+        self._model_multimodal_kwargs = kwargs.get('model', {}).copy() if kwargs.get('model') else None
 
         # Fuse mechanism is fully automatic - no manual configuration needed
 
@@ -117,6 +145,12 @@ class WebAgent(MultiStepAgent):
         self.ACTIVE_FUNCTIONS.update(stop=self._my_stop, save=self._my_save, screenshot=self._my_screenshot)
         # --
 
+    @functools.cached_property
+    def model_multimodal(self):
+        if self._model_multimodal_kwargs:
+            return LLM(**self._model_multimodal_kwargs)
+        return LLM(_default_init=True)  # default init to avoid validation errors when not configured
+
     # note: a specific stop function!
     def _my_stop(self, answer: str = None, summary: str = None, output: str = None):
         if output:
@@ -135,8 +169,17 @@ class WebAgent(MultiStepAgent):
             if local_path != remote_path:
                 remote_path = remote_path.strip()
                 if remote_path.startswith("http://") or remote_path.startswith("https://"):  # retrieve from the web
-                    urllib.request.urlretrieve(remote_path, local_path)
-                else:  # simply copy!
+                    if self._dl_session is None:
+                        import requests
+                        self._dl_session = requests.Session()  # keep-alive: skips TLS handshake on repeat hosts
+                    with self._dl_session.get(remote_path, stream=True, timeout=30) as response:
+                        response.raise_for_status()
+                        with open(local_path, "wb") as fd:
+                            shutil.copyfileobj(response.raw, fd, length=1024*1024)  # 1 MiB reads amortize syscalls
+                else:  # simply copy! (copyfile already uses sendfile on Linux; just hint sequential reads)
+                    if hasattr(os, "posix_fadvise"):
+                        with open(remote_path, "rb") as src:
+                            os.posix_fadvise(src.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
                     shutil.copyfile(remote_path, local_path)
             ret = f"Save Succeed: from remote_path = {remote_path} to local_path = {local_path}"
         except Exception as e:
@@ -200,17 +243,25 @@ def web_agent(task: str) -> dict:
             # 使用内置实现
             builtin_kwargs = {k: v for k, v in _kwargs.items()
                             if k in ["starting_target_url", "logger", "headless", "max_browsers", "web_timeout"]}
+            builtin_kwargs["extract_html_md"] = self.html_md_budget > 0  # no budget -> skip DOM serialization
             # Run builtin PlaywrightWebEnv entirely on a dedicated thread to avoid asyncio-loop conflicts
             self.web_envs[_id] = ThreadedWebEnv(**builtin_kwargs)
 
+    _WEB_IP_PROBE_TTL = 60.  # seconds to trust a cached probe result
+
     def _test_web_ip_connection(self, web_ip: str) -> bool:
-        """测试web_ip连接性"""
+        """测试web_ip连接性 (cheap TCP probe, cached so every new session doesn't block on it)"""
+        _probe = self._web_ip_probe
+        if _probe is not None and _probe[1] == web_ip and time.monotonic() - _probe[0] < self._WEB_IP_PROBE_TTL:
+            return _probe[2]
         try:
-            import requests
-            response = requests.get(f"http://{web_ip}/health", timeout=5)
-            return response.status_code == 200
+            host, port = web_ip.rsplit(":", 1)
+            with socket.create_connection((host, int(port)), timeout=0.25):
+                ok = True
         except Exception:
-            return False
+            ok = False
+        self._web_ip_probe = (time.monotonic(), web_ip, ok)
+        return ok
 
     def end_run(self, session):
         ret = super().end_run(session)
@@ -220,7 +271,11 @@ def web_agent(task: str) -> dict:
         return ret
 
     def step_call(self, messages, session, model=None):
-        _use_multimodal = session.info.get("use_multimodal", False) or have_images_in_messages(messages)
+        # once a session has gone multimodal it stays multimodal: a sticky flag skips
+        # re-scanning the whole messages list for images on every later call
+        _use_multimodal = session.info.get("use_multimodal", False) or session.info.get("_went_mm", False) or have_images_in_messages(messages)
+        if _use_multimodal:
+            session.info["_went_mm"] = True
         if model is None:
             model = self.model_multimodal if _use_multimodal else self.model  # use which model?
         response = model(messages)
@@ -237,51 +292,62 @@ def web_agent(task: str) -> dict:
             _input_kwargs.update(self._prep_page(_prev_step["action"]["web_state_before"], suffix="_old"))
         else:
             _input_kwargs["web_page_old"] = "N/A"
-        _input_kwargs["html_md"] = self._prep_html_md(_web_state)
+        _input_kwargs["html_md"] = self._prep_html_md(_web_state) if self.html_md_budget > 0 else ""
         # --
         # check web page differences
         if session.num_of_steps() >= self.check_nodiff_steps and self.check_nodiff_steps > 1:
-            _check_pages = [self._prep_page(z["action"]["web_state_before"]) for z in session.get_latest_steps(count=self.check_nodiff_steps-1)] + [_this_page_info]
-            if all(z==_check_pages[0] for z in _check_pages):  # error
-                # 埋点：检测到卡在同一页面的错误
-                if self.logger:
-                    self.logger.warning("[WEB_FALLBACK] Trigger: stuck_same_page | Method: stop_function | Result: error_message_added | Impact: task_termination")
-                _input_kwargs["web_page"] = _input_kwargs["web_page"] + "\n(* Error: Notice that we have been stuck at the same page for many steps, use the `stop` function to terminate and report related errors!!)"
-            elif _check_pages[-1] == _check_pages[-2]:  # warning
-                # 埋点：检测到页面未变化的警告
-                if self.logger:
-                    self.logger.debug("[WEB_DECISION] page_unchanged -> warning_message")
-                _input_kwargs["web_page"] = _input_kwargs["web_page"] + "\n(* Warning: Notice that the web page has not been changed.)"
+            # compare 16-byte fingerprints rather than full page dicts (axtree strings are multi-KB);
+            # common case exits on the first (newest) mismatch without touching older history
+            _cur_fp = self._page_fp(_web_state)
+            _history = session.get_latest_steps(count=self.check_nodiff_steps-1)
+            if _cur_fp == self._page_fp(_history[-1]["action"]["web_state_before"]):
+                if all(self._page_fp(z["action"]["web_state_before"]) == _cur_fp for z in _history):  # error
+                    # 埋点：检测到卡在同一页面的错误
+                    if self.logger:
+                        self.logger.warning("[WEB_FALLBACK] Trigger: stuck_same_page | Method: stop_function | Result: error_message_added | Impact: task_termination")
+                    _input_kwargs["web_page"] = _input_kwargs["web_page"] + "\n(* Error: Notice that we have been stuck at the same page for many steps, use the `stop` function to terminate and report related errors!!)"
+                else:  # warning
+                    # 埋点：检测到页面未变化的警告
+                    if self.logger:
+                        self.logger.debug("[WEB_DECISION] page_unchanged -> warning_message")
+                    _input_kwargs["web_page"] = _input_kwargs["web_page"] + "\n(* Warning: Notice that the web page has not been changed.)"
         # --
         _extra_kwargs["web_env"] = _web_env
         return _input_kwargs, _extra_kwargs
 
     def step_action(self, action_res, action_input_kwargs, web_env=None, **kwargs):
-        action_res["web_state_before"] = web_env.get_state()  # inplace storage of the web-state before the action
-        _rr = super().step_action(action_res, action_input_kwargs)  # get action from code execution
+        # the action code only builds an action string, so the pre-action state can be
+        # captured inside the fused browser call below instead of a separate roundtrip
+        _rr = super().step_action(action_res, action_input_kwargs, **kwargs)  # get action from code execution
         if isinstance(_rr, ActionResult):
             action_str, action_result = _rr.action, _rr.result
         else:
             action_str = self.get_obs_str(None, obs=_rr, add_seq_enum=False)
             action_str, action_result = "nop", action_str.strip()  # no-operation
 
-        # 埋点：浏览器动作执行前
-        if self.logger:
-            current_state = web_env.get_state()
-            current_url = current_state.get('current_url', 'unknown')
+        # 埋点：浏览器动作执行前 (level-gated: skip log-only work when INFO is off)
+        _log_info = self.logger is not None and self.logger.isEnabledFor(logging.INFO)
+        if _log_info:
             self.logger.info("[WEB_BROWSER] Executing: %s", action_str)
-            self.logger.debug("[WEB_STATE] Before_URL: %s", current_url)
 
         # state step
+        _state_before = None
         try:  # execute the action on the browser
-            step_result = web_env.step_state(action_str)
+            _fused = getattr(web_env, "step_full", None)
+            if _fused is not None:  # one cross-thread hop instead of four
+                _state_before, step_result, new_state = _fused(action_str)
+            else:
+                _state_before = web_env.get_state()
+                step_result = web_env.step_state(action_str)
+                web_env.sync_files()
+                new_state = web_env.get_state() if _log_info else None
             ret = action_result if action_result is not None else step_result  # use action result if there are direct ones
-            web_env.sync_files()
 
             # 埋点：浏览器动作执行后
-            if self.logger:
-                new_state = web_env.get_state()
+            if _log_info:
+                current_url = _state_before.get('current_url', 'unknown')
                 new_url = new_state.get('current_url', 'unknown')
+                self.logger.debug("[WEB_STATE] Before_URL: %s", current_url)
                 self.logger.info("[WEB_BROWSER] Result: success | URL: %s", new_url)
                 if new_url != current_url:
                     self.logger.info("[WEB_STATE] URL_Changed: %s -> %s", current_url, new_url)
@@ -292,13 +358,76 @@ def web_agent(task: str) -> dict:
             # 埋点：浏览器动作执行错误
             if self.logger:
                 self.logger.error("[WEB_BROWSER] Error: %s", str(e))
+            if _state_before is None:  # best effort: the step record still needs a before-state
+                try:
+                    _state_before = web_env.get_state()
+                except Exception:
+                    _state_before = {"current_accessibility_tree": "**Warning**: The accessibility tree is currently unavailable.",
+                                     "error_message": str(e), "current_has_cookie_popup": False, "downloaded_file_path": []}
+        # intern the big payloads before the state enters the step record: unchanged pages
+        # across a long session then share one string instead of per-step copies
+        _state_before["current_accessibility_tree"] = self._intern_blob(_state_before["current_accessibility_tree"])
+        if _state_before.get("boxed_screenshot"):
+            _state_before["boxed_screenshot"] = self._intern_blob(_state_before["boxed_screenshot"])
+        action_res["web_state_before"] = _state_before  # inplace storage of the web-state before the action
         return ret
 
     # --
     # other helpers
 
+    @staticmethod
+    def _page_fp(web_state):
+        """Cheap page fingerprint for the stuck-page check, cached on the state dict."""
+        fp = web_state.get("_page_fp")
+        if fp is None:
+            h = hashlib.blake2b(web_state["current_accessibility_tree"].encode(), digest_size=16)
+            h.update(str(web_state["error_message"]).encode())
+            h.update(b"1" if web_state["current_has_cookie_popup"] else b"0")
+            fp = h.hexdigest()
+            web_state["_page_fp"] = fp  # hex string: keeps the state dict JSON-serializable
+        return fp
+
+    def _intern_blob(self, data):
+        """Dedup large strings (screenshots, axtrees) by content hash (LRU): on static/stuck
+        pages the same payload recurs every step, so reuse one string object instead of
+        keeping per-step copies alive (and let equality checks hit the identity fast path)."""
+        key = hashlib.blake2b(data.encode() if isinstance(data, str) else data, digest_size=8).digest()
+        cached = self._mm_cache.get(key)
+        if cached is not None:
+            self._mm_cache.move_to_end(key)
+            return cached
+        self._mm_cache[key] = data
+        while len(self._mm_cache) > self._mm_cache_maxsize:
+            self._mm_cache.popitem(last=False)
+        return data
+
+    # per-mode screenshot attachment (see _SS_DISPATCH below)
+    def _attach_screenshot_on(self, ret, _ss):  # always on
+        ret["screenshot"] = self._intern_blob(_ss["boxed_screenshot"])
+
+    def _attach_screenshot_off(self, ret, _ss):
+        ret["screenshot_note"] = "The current system does not support webpage screenshots. Please refer to the accessibility tree to understand the current webpage."
+
+    def _attach_screenshot_auto(self, ret, _ss):  # adaptive decision
+        if _ss.get("curr_screenshot_mode"):  # currently on
+            ret["screenshot"] = self._intern_blob(_ss["boxed_screenshot"])
+        else:
+            ret["screenshot_note"] = "The current system's screenshot mode is off. If you need the screenshots, please use the corresponding action to turn it on."
+
+    _SS_DISPATCH = {'on': _attach_screenshot_on, 'off': _attach_screenshot_off, 'auto': _attach_screenshot_auto}
+
     def _prep_page(self, web_state, suffix=""):
+        # the current page becomes next step's "old" page and the nodiff check replays
+        # recent history, so the same state is prepared repeatedly: memoize on content
         _ss = web_state
+        _with_ss = self.use_multimodal == 'on' or (self.use_multimodal != 'off' and _ss.get("curr_screenshot_mode"))
+        _cache_key = (_ss["current_accessibility_tree"], _ss["error_message"], bool(_ss["current_has_cookie_popup"]),
+                      str(_ss["downloaded_file_path"]), self.use_multimodal, bool(_ss.get("curr_screenshot_mode")),
+                      _ss.get("boxed_screenshot") if _with_ss else None)
+        _cached = self._page_cache.get(_cache_key)
+        if _cached is not None:
+            self._page_cache.move_to_end(_cache_key)
+            return {k+suffix: v for k, v in _cached.items()} if suffix else _cached
         _ret = _ss["current_accessibility_tree"]
         if _ss["error_message"]:
             _ret = _ret + "\n(Note: " + _ss["error_message"] + ")"
@@ -306,20 +435,54 @@ def web_agent(task: str) -> dict:
             _ret = _ret + "\n(Note: There is a cookie banner on the page, please accept the cookie banner.)"
         ret = {"web_page": _ret, "downloaded_file_path": _ss["downloaded_file_path"]}
         # --
-        if self.use_multimodal == 'on':  # always on
-            ret["screenshot"] = _ss["boxed_screenshot"]
-        elif self.use_multimodal == 'off':
-            ret["screenshot_note"] = "The current system does not support webpage screenshots. Please refer to the accessibility tree to understand the current webpage."
-        else:  # adaptive decision
-            if web_state.get("curr_screenshot_mode"):  # currently on
-                ret["screenshot"] = _ss["boxed_screenshot"]
-            else:
-                ret["screenshot_note"] = "The current system's screenshot mode is off. If you need the screenshots, please use the corresponding action to turn it on."
+        # resolved through a dispatch table rather than re-branching on the mode every call
+        self._SS_DISPATCH.get(self.use_multimodal, WebAgent._attach_screenshot_auto)(self, ret, _ss)
         # --
+        self._page_cache[_cache_key] = ret
+        while len(self._page_cache) > self._page_cache_maxsize:
+            self._page_cache.popitem(last=False)
         if suffix:
             ret = {k+suffix: v for k, v in ret.items()}
         return ret
 
+    @staticmethod
+    def _find_hit_lines(axtree_texts, html_lines, window):
+        """Mark html lines containing any axtree text (plus a local window around each hit).
+        Returns a bytearray mask over html_lines: windows become C-level slice fills and the
+        caller walks the mask in order without building/sorting a set."""
+        _num_lines = len(html_lines)
+        hit_mask = bytearray(_num_lines)
+        _ones = b"\x01" * (2*window+1)
+        def _mark(_curr):
+            lo, hi = max(0, _curr-window), min(_num_lines, _curr+window+1)
+            hit_mask[lo:hi] = _ones[:hi-lo]
+        if _HAS_AHOCORASICK and axtree_texts and html_lines:
+            # single linear DFA pass over the joined text instead of per-text substring scans
+            import ahocorasick
+            automaton = ahocorasick.Automaton()
+            for one_t in axtree_texts:
+                if one_t:
+                    automaton.add_word(one_t, one_t)
+            automaton.make_automaton()
+            joined = "\n".join(html_lines)
+            line_ends, _off = [], 0
+            for _line in html_lines:
+                _off += len(_line) + 1  # +1 for the joining newline
+                line_ends.append(_off)
+            for end_idx, _ in automaton.iter(joined):
+                _mark(bisect_right(line_ends, end_idx))
+        else:  # fallback: forward substring scan per text
+            _last_hit = 0
+            for one_t in axtree_texts:
+                _curr = _last_hit
+                while _curr < _num_lines:
+                    if one_t in html_lines[_curr]: # hit
+                        _mark(_curr)  # add local window
+                        _last_hit = _curr
+                        break
+                    _curr += 1
+        return hit_mask
+
     def _prep_html_md(self, web_state):
         _IGNORE_LINE_LEN = 7  # ignore md line if <= this
         _LOCAL_WINDOW = 2  # -W -> +W
@@ -328,44 +491,43 @@ def web_agent(task: str) -> dict:
             return ""
         # --
         axtree, html_md = web_state["current_accessibility_tree"], web_state.get("html_md", "")
-        # first locate raw texts from axtree
-        axtree_texts = []
-        for line in axtree.split("\n"):
-            m = re.findall(r"(?:StaticText|link)\s+'(.*)'", line)
-            axtree_texts.extend(m)
+        # first locate raw texts from axtree (single findall over the whole tree, no per-line split);
+        # dedup repeated texts ("Home", "Search", ...) and drop tiny ones that match almost anywhere
+        _seen = set()
+        axtree_texts = [t for t in _AX_RE.findall(axtree) if len(t) >= 3 and not (t in _seen or _seen.add(t))]
         # then locate to the html ones
         html_lines = [z for z in html_md.split("\n") if z.strip() and len(z) > _IGNORE_LINE_LEN]
-        hit_lines = set()
-        _last_hit = 0
-        for one_t in axtree_texts:
-            _curr = _last_hit
-            while _curr < len(html_lines):
-                if one_t in html_lines[_curr]: # hit
-                    hit_lines.update([ii for ii in range(_curr-_LOCAL_WINDOW, _curr+_LOCAL_WINDOW+1) if ii>=0 and ii<len(html_lines)])  # add local window
-                    _last_hit = _curr
-                    break
-                _curr += 1
-        # get the contents
+        hit_mask = self._find_hit_lines(axtree_texts, html_lines, _LOCAL_WINDOW)
+        # get the contents (byte lengths precomputed once: lines recur in both passes)
+        html_line_bytes = [len(z.rstrip().encode()) for z in html_lines]
         _last_idx = -1
         _all_addings = []
         _all_adding_lines = []
-        for line_idx in sorted(hit_lines):
+        for line_idx, _hit in enumerate(hit_mask):
+            if not _hit:
+                continue
             if _budget < 0:
                 break
             _line = html_lines[line_idx].rstrip()
-            adding = f"...\n{_line}" if (line_idx > _last_idx+1) else _line
-            _all_addings.append(adding)
+            _gap = line_idx > _last_idx+1
+            _all_addings.append(f"...\n{_line}" if _gap else _line)
             _all_adding_lines.append(line_idx)
-            _budget -= len(adding.encode())  # with regard to bytes!
+            _budget -= html_line_bytes[line_idx] + (4 if _gap else 0)  # with regard to bytes! (4 = "...\n")
             _last_idx = line_idx
-        while _budget > 0:  # add more lines if we still have budget
-            _last_idx = _last_idx + 1
-            if _last_idx >= len(html_lines):
-                break
-            _line = html_lines[_last_idx].rstrip()
-            _all_addings.append(_line)
-            _all_adding_lines.append(_last_idx)
-            _budget -= len(_line.encode())  # with regard to bytes!
+        if _budget > 0:  # add more lines if we still have budget (tail fill via prefix sums, no Python loop)
+            _start = _last_idx + 1
+            if _start >= len(html_lines):
+                _last_idx = len(html_lines)
+            else:
+                csum = list(accumulate(html_line_bytes))
+                _prev = csum[_last_idx] if _last_idx >= 0 else 0
+                new_last = min(len(html_lines) - 1, bisect_left(csum, _prev + _budget))
+                _all_addings.extend(html_lines[ii].rstrip() for ii in range(_start, new_last+1))
+                _all_adding_lines.extend(range(_start, new_last+1))
+                _budget -= csum[new_last] - _prev  # with regard to bytes!
+                _last_idx = new_last
+                if _last_idx == len(html_lines) - 1 and _budget > 0:
+                    _last_idx += 1  # everything fit: no trailing ellipsis
         if _last_idx < len(html_lines):
             _all_addings.append("...")
         final_ret = "\n".join(_all_addings)
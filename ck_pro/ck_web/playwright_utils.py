@@ -3,39 +3,162 @@
 # 替换HTTP API架构，直接使用Playwright Python API
 
 import os
+import re
 import time
 import base64
-import json
+import hashlib
 import uuid
 import asyncio
 import threading
+import weakref
+from collections import OrderedDict
 from typing import Dict, List, Optional, Any
-from contextlib import asynccontextmanager
 from playwright.async_api import async_playwright, Browser, BrowserContext, Page
-from playwright.sync_api import sync_playwright, Browser as SyncBrowser, BrowserContext as SyncBrowserContext, Page as SyncPage
 
 from ..agents.utils import KwargsInitializable, rprint, zwarn, zlog
 from .utils import WebState, MyMarkdownify
 
+# all Playwright traffic is multiplexed onto one background event loop thread:
+# CDP round trips from concurrent sessions overlap instead of each session
+# pinning an OS thread on blocking sync calls
+_loop_lock = threading.Lock()
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _get_event_loop() -> asyncio.AbstractEventLoop:
+    """获取(懒启动)共享的Playwright事件循环"""
+    global _loop
+    with _loop_lock:
+        if _loop is None or _loop.is_closed():
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="playwright-loop", daemon=True)
+            thread.start()
+            _loop = loop
+        return _loop
+
+
+def _run_sync(coro):
+    """在共享事件循环上执行协程并阻塞等待结果 (must NOT be called from the loop thread itself)"""
+    return asyncio.run_coroutine_threadsafe(coro, _get_event_loop()).result()
+
+
+# one DOM-side probe per step: URL, (optional) serialized HTML and the cookie-popup check
+# come back in a single CDP round trip instead of one per item
+# action-string patterns, compiled once for the per-step parse
+_CLICK_RE = re.compile(r'click\s+\[(\d+)\]\s*(.*)')
+_TYPE_RE = re.compile(r'type\s+\[(\d+)\]\s+(.*?)(?:\[NOENTER\])?$')
+_SCROLL_UP_ACTIONS = frozenset({"scroll_up", "scroll up"})
+_SCROLL_DOWN_ACTIONS = frozenset({"scroll_down", "scroll down"})
+
+_PAGE_PROBE_JS = """(withHtml) => {
+  let hasCookie = !!document.querySelector('[id*="cookie"],[class*="cookie"],[id*="consent"],[class*="consent"]');
+  if (!hasCookie) {
+    for (const b of document.querySelectorAll('button')) {
+      const t = (b.textContent || '').toLowerCase();
+      if (t.includes('accept') || t.includes('allow') || t.includes('agree')) { hasCookie = true; break; }
+    }
+  }
+  return {
+    url: location.href,
+    hasCookie: hasCookie,
+    html: withHtml ? document.documentElement.outerHTML : ''
+  };
+}"""
+
 
 class PlaywrightBrowserPool:
-    """Playwright浏览器池管理器"""
+    """Playwright浏览器池管理器
+
+    Browser processes are shared and long-lived; each pool slot (browser_id) is an
+    incognito BrowserContext on one of them, so per-session cost is a context
+    (~tens of ms / tens of MB) instead of a Chromium process launch.
+
+    All CDP work runs as coroutines on the shared module-level event loop; the
+    public methods are thin sync facades over run_coroutine_threadsafe, so the
+    callers (one worker thread per session) keep their blocking API. Slot-dict
+    check-then-mutate sequences contain no awaits and therefore never interleave
+    on the single loop thread; no locks are needed around them.
+    """
+
+    _LAUNCH_ARGS = [
+        '--no-sandbox',
+        '--disable-dev-shm-usage',
+        '--disable-gpu',
+        '--disable-web-security',
+        '--disable-features=VizDisplayCompositor',
+        '--disable-background-timer-throttling',
+        '--disable-backgrounding-occluded-windows',
+        '--disable-renderer-backgrounding'
+    ]
+    _MAX_SHARED_BROWSERS = 2
+    _MAX_IDLE_SLOTS = 2
+    _EVICT_WATERMARK = 0.9  # evict the LRU slot once utilization crosses this, regardless of age
 
     def __init__(self, max_browsers: int = 16, headless: bool = True, logger=None):
         self.max_browsers = max_browsers
         self.headless = headless
         self.logger = logger
-        self.browsers: Dict[str, Dict] = {}
+        self.browsers: "OrderedDict[str, Dict]" = OrderedDict()  # browser_id -> slot, LRU order (front = coldest)
         self.playwright = None
         self.browser_type = None
-        self._lock = threading.Lock()
-        
+        self._shared_browsers: List[Browser] = []  # long-lived processes backing the contexts
+        self._shared_rr = 0  # round-robin cursor over shared browsers
+        self._idle_slots: List[Dict] = []  # scrubbed context+page slots parked for reuse
+        self._launch_lock = asyncio.Lock()  # serializes shared-browser launches (spans an await)
+
+    # ===== sync facade (called from session worker threads) =====
+
     def start(self):
         """启动Playwright和浏览器池"""
+        _run_sync(self._start_async())
+
+    def stop(self, wait: bool = True):
+        """停止所有浏览器和Playwright (wait=False: fire-and-forget, safe during finalization)"""
+        future = asyncio.run_coroutine_threadsafe(self._stop_async(), _get_event_loop())
+        if wait:
+            future.result()
+
+    def get_browser(self, storage_state=None, geo_location=None) -> str:
+        """获取浏览器实例，返回browser_id"""
+        return _run_sync(self._get_browser_async(storage_state, geo_location))
+
+    def close_browser(self, browser_id: str):
+        """关闭指定浏览器"""
+        _run_sync(self._close_browser_async(browser_id))
+
+    def acquire_page(self, browser_id: str) -> Page:
+        """获取页面：优先复用回收的warm page，否则新建"""
+        return _run_sync(self._acquire_page_async(browser_id))
+
+    def get_browser_context(self, browser_id: str) -> Optional[BrowserContext]:
+        """获取浏览器上下文 (plain dict read, no CDP: callable from any thread)"""
+        browser_info = self.browsers.get(browser_id)
+        if browser_info:
+            browser_info['last_activity'] = time.time()
+            try:
+                self.browsers.move_to_end(browser_id)  # mark MRU; single C call, GIL-atomic
+            except KeyError:
+                pass  # raced with close/evict; the stale info dict is still safe to read
+            return browser_info.get('context')
+        return None
+
+    def get_status(self):
+        """获取浏览器池状态"""
+        statuses = [b['status'] for b in list(self.browsers.values())]
+        return {
+            'active': statuses.count('active'),
+            'total': len(statuses),
+            'available': self.max_browsers - len(statuses),
+            'max_browsers': self.max_browsers
+        }
+
+    # ===== coroutines (run on the shared event loop) =====
+
+    async def _start_async(self):
         if self.playwright is None:
             # 简单直接的启动方式
             try:
-                self.playwright = sync_playwright().start()
+                self.playwright = await async_playwright().start()
             except Exception as e:
                 if self.logger:
                     self.logger.error("[PLAYWRIGHT_POOL] Failed to start Playwright: %s", e)
@@ -46,171 +169,259 @@ class PlaywrightBrowserPool:
 
             if self.logger:
                 self.logger.info("[PLAYWRIGHT_POOL] Started with max_browsers=%d (Chrome headless)", self.max_browsers)
-    
-    def stop(self):
-        """停止所有浏览器和Playwright"""
-        with self._lock:
-            for browser_id, browser_info in self.browsers.items():
-                try:
-                    if browser_info.get('context'):
-                        browser_info['context'].close()
-                    if browser_info.get('browser'):
-                        browser_info['browser'].close()
-                except Exception as e:
-                    if self.logger:
-                        self.logger.warning("[PLAYWRIGHT_POOL] Error closing browser %s: %s", browser_id, e)
 
-            self.browsers.clear()
+    async def _stop_async(self):
+        for browser_id, browser_info in list(self.browsers.items()):
+            try:
+                if browser_info.get('context'):
+                    await browser_info['context'].close()
+            except Exception as e:
+                if self.logger:
+                    self.logger.warning("[PLAYWRIGHT_POOL] Error closing browser %s: %s", browser_id, e)
 
-            if self.playwright:
-                self.playwright.stop()
-                self.playwright = None
+        self.browsers.clear()
 
-            if self.logger:
-                self.logger.info("[PLAYWRIGHT_POOL] Stopped")
-    
-    def get_browser(self, storage_state=None, geo_location=None) -> str:
-        """获取浏览器实例，返回browser_id"""
-        with self._lock:
-            # 检查是否有可用的浏览器槽位
-            if len(self.browsers) >= self.max_browsers:
-                # 清理不活跃的浏览器
-                self._cleanup_inactive_browsers()
-                
-                if len(self.browsers) >= self.max_browsers:
-                    raise RuntimeError(f"Browser pool exhausted (max: {self.max_browsers})")
-            
-            browser_id = str(uuid.uuid4())
-            
+        for slot in self._idle_slots:
+            try:
+                await slot['context'].close()
+            except Exception as e:
+                if self.logger:
+                    self.logger.warning("[PLAYWRIGHT_POOL] Error closing idle slot: %s", e)
+        self._idle_slots.clear()
+
+        for browser in self._shared_browsers:
             try:
-                # 启动新浏览器 - 使用Chrome headless模式
-                launch_args = [
-                    '--no-sandbox',
-                    '--disable-dev-shm-usage',
-                    '--disable-gpu',
-                    '--disable-web-security',
-                    '--disable-features=VizDisplayCompositor',
-                    '--disable-background-timer-throttling',
-                    '--disable-backgrounding-occluded-windows',
-                    '--disable-renderer-backgrounding'
-                ]
-
-                # Docker环境不再需要特殊参数 - 移除不必要的环境变量检查
-                # launch_args.extend([
-                #     '--disable-dev-shm-usage',
-                #     '--no-first-run',
-                #     '--no-default-browser-check'
-                # ])
+                await browser.close()
+            except Exception as e:
+                if self.logger:
+                    self.logger.warning("[PLAYWRIGHT_POOL] Error closing shared browser: %s", e)
+        self._shared_browsers.clear()
 
+        if self.playwright:
+            await self.playwright.stop()
+            self.playwright = None
+
+        if self.logger:
+            self.logger.info("[PLAYWRIGHT_POOL] Stopped")
+
+    async def _get_shared_browser(self) -> Browser:
+        """获取共享浏览器进程 (launched lazily, reused round-robin)"""
+        async with self._launch_lock:  # the launch awaits; serialize so the cap holds
+            if len(self._shared_browsers) < self._MAX_SHARED_BROWSERS:
                 # 尝试使用Chrome，如果失败则回退到Chromium
                 try:
-                    browser = self.browser_type.launch(
+                    browser = await self.browser_type.launch(
                         headless=self.headless,
-                        args=launch_args,
+                        args=self._LAUNCH_ARGS,
                         channel="chrome"  # 明确指定使用Chrome
                     )
                 except Exception as e:
                     if self.logger:
                         self.logger.warning("[PLAYWRIGHT_POOL] Chrome not available, falling back to Chromium: %s", e)
-                    browser = self.browser_type.launch(
+                    browser = await self.browser_type.launch(
                         headless=self.headless,
-                        args=launch_args
+                        args=self._LAUNCH_ARGS
                     )
-                
-                # 创建浏览器上下文 - 使用真实Chrome用户代理
-                context_options = {
-                    'viewport': {'width': 1024, 'height': 768},
-                    'locale': 'en-US',
-                    'geolocation': geo_location or {'latitude': 40.4415, 'longitude': -80.0125},
-                    'permissions': ['geolocation'],
-                    'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                    'extra_http_headers': {
-                        'Accept-Language': 'en-US,en;q=0.9',
-                        'Accept-Encoding': 'gzip, deflate, br',
-                        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8'
-                    }
-                }
-                
-                if storage_state:
-                    context_options['storage_state'] = storage_state
-                
-                context = browser.new_context(**context_options)
-                
-                self.browsers[browser_id] = {
-                    'browser': browser,
-                    'context': context,
-                    'pages': {},
-                    'last_activity': time.time(),
-                    'status': 'active'
+                self._shared_browsers.append(browser)
+                return browser
+            self._shared_rr = (self._shared_rr + 1) % len(self._shared_browsers)
+            return self._shared_browsers[self._shared_rr]
+
+    async def _get_browser_async(self, storage_state=None, geo_location=None) -> str:
+        browser_id = str(uuid.uuid4())
+
+        # 高水位主动按LRU淘汰，不等1小时闲置阈值 (避免短生命周期会话撑满池)
+        if len(self.browsers) >= int(self.max_browsers * self._EVICT_WATERMARK):
+            # 先清理超过闲置阈值的 (secondary guard)
+            await self._cleanup_inactive_browsers()
+            if len(self.browsers) >= int(self.max_browsers * self._EVICT_WATERMARK):
+                self._evict_lru()
+
+        if len(self.browsers) >= self.max_browsers:
+            raise RuntimeError(f"Browser pool exhausted (max: {self.max_browsers})")
+
+        if storage_state is None and self._idle_slots:
+            # 复用回收的context+page槽位：跳过context/page构建
+            slot = self._idle_slots.pop()
+            self.browsers[browser_id] = {
+                'browser': slot['browser'],
+                'context': slot['context'],
+                'pages': {},
+                'idle_pages': slot['idle_pages'],
+                'has_storage_state': False,
+                'last_activity': time.time(),
+                'status': 'active'
+            }
+            if self.logger:
+                self.logger.info("[PLAYWRIGHT_POOL] Reused recycled slot for browser %s", browser_id)
+            return browser_id
+
+        # 先占位：launch/new_context会await，期间其它协程可能交错执行
+        self.browsers[browser_id] = {
+            'browser': None,
+            'context': None,
+            'pages': {},
+            'idle_pages': [],
+            'has_storage_state': storage_state is not None,
+            'last_activity': time.time(),
+            'status': 'starting'
+        }
+
+        context = None
+        try:
+            # 复用共享浏览器进程：每个会话只新建一个context
+            browser = await self._get_shared_browser()
+
+            # 创建浏览器上下文 - 使用真实Chrome用户代理
+            context_options = {
+                'viewport': {'width': 1024, 'height': 768},
+                'locale': 'en-US',
+                'geolocation': geo_location or {'latitude': 40.4415, 'longitude': -80.0125},
+                'permissions': ['geolocation'],
+                'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+                'extra_http_headers': {
+                    'Accept-Language': 'en-US,en;q=0.9',
+                    'Accept-Encoding': 'gzip, deflate, br',
+                    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8'
                 }
-                
-                if self.logger:
-                    self.logger.info("[PLAYWRIGHT_POOL] Created browser %s", browser_id)
-                
-                return browser_id
-                
-            except Exception as e:
-                if self.logger:
-                    self.logger.error("[PLAYWRIGHT_POOL] Failed to create browser: %s", e)
-                raise
-    
-    def close_browser(self, browser_id: str):
-        """关闭指定浏览器"""
-        with self._lock:
-            if browser_id in self.browsers:
-                browser_info = self.browsers[browser_id]
-                try:
-                    if browser_info.get('context'):
-                        browser_info['context'].close()
-                    if browser_info.get('browser'):
-                        browser_info['browser'].close()
-                    
-                    del self.browsers[browser_id]
-                    
-                    if self.logger:
-                        self.logger.info("[PLAYWRIGHT_POOL] Closed browser %s", browser_id)
-                        
-                except Exception as e:
-                    if self.logger:
-                        self.logger.warning("[PLAYWRIGHT_POOL] Error closing browser %s: %s", browser_id, e)
-    
-    def get_browser_context(self, browser_id: str) -> Optional[SyncBrowserContext]:
-        """获取浏览器上下文"""
-        browser_info = self.browsers.get(browser_id)
-        if browser_info:
+            }
+
+            if storage_state:
+                context_options['storage_state'] = storage_state
+
+            context = await browser.new_context(**context_options)
+
+            # 把真实对象装入占位槽
+            browser_info = self.browsers.get(browser_id)
+            if browser_info is None:
+                # 占位槽在启动期间被关闭（如pool.stop()）
+                raise RuntimeError(f"Browser {browser_id} was closed during startup")
+            browser_info['browser'] = browser
+            browser_info['context'] = context
             browser_info['last_activity'] = time.time()
-            return browser_info.get('context')
-        return None
-    
-    def _cleanup_inactive_browsers(self):
+            browser_info['status'] = 'active'
+
+            if self.logger:
+                self.logger.info("[PLAYWRIGHT_POOL] Created browser %s", browser_id)
+
+            return browser_id
+
+        except Exception as e:
+            self.browsers.pop(browser_id, None)
+            if context is not None:
+                try:
+                    await context.close()
+                except Exception:
+                    pass
+            if self.logger:
+                self.logger.error("[PLAYWRIGHT_POOL] Failed to create browser: %s", e)
+            raise
+
+    async def _close_browser_async(self, browser_id: str):
+        """关闭/回收槽位"""
+        browser_info = self.browsers.pop(browser_id, None)
+        if browser_info is None:
+            return
+        # park scrubbed slots for reuse instead of closing them (custom storage_state excluded)
+        if (not browser_info.get('has_storage_state')
+                and len(self._idle_slots) < self._MAX_IDLE_SLOTS
+                and await self._recycle_slot(browser_info)):
+            if self.logger:
+                self.logger.info("[PLAYWRIGHT_POOL] Recycled browser %s", browser_id)
+            return
+        try:
+            # only the per-session context closes; the shared browser process stays up
+            if browser_info.get('context'):
+                await browser_info['context'].close()
+            if self.logger:
+                self.logger.info("[PLAYWRIGHT_POOL] Closed browser %s", browser_id)
+        except Exception as e:
+            if self.logger:
+                self.logger.warning("[PLAYWRIGHT_POOL] Error closing browser %s: %s", browser_id, e)
+
+    def _evict_lru(self):
+        """淘汰最久未使用的active槽位; context关闭作为后台task，不阻塞调用者"""
+        for browser_id, browser_info in list(self.browsers.items()):  # front of the OrderedDict = coldest
+            if browser_info.get('status') != 'active':
+                continue  # never evict a slot still mid-startup
+            del self.browsers[browser_id]
+            context = browser_info.get('context')
+            if context is not None:
+                asyncio.ensure_future(self._close_context_quietly(context, browser_id))
+            if self.logger:
+                self.logger.info("[PLAYWRIGHT_POOL] Evicted LRU browser %s", browser_id)
+            return
+
+    async def _close_context_quietly(self, context, browser_id: str):
+        """后台关闭被淘汰槽位的context"""
+        try:
+            await context.close()
+        except Exception as e:
+            if self.logger:
+                self.logger.warning("[PLAYWRIGHT_POOL] Error closing evicted browser %s: %s", browser_id, e)
+
+    async def _recycle_slot(self, browser_info: Dict) -> bool:
+        """Scrub a session slot (blank page, cleared cookies, detached download handler) and
+        park it in _idle_slots; returns False so the caller closes the context if scrubbing fails."""
+        try:
+            context = browser_info['context']
+            handler = browser_info.get('download_handler')
+            keep = None
+            for page in browser_info['pages'].values():
+                if handler is not None:
+                    try:
+                        page.remove_listener("download", handler)
+                    except Exception:
+                        pass
+                if keep is None:
+                    await page.goto("about:blank")
+                    keep = page
+                else:
+                    await page.close()
+            await context.clear_cookies()
+            idle_pages = browser_info.get('idle_pages') or []
+            if keep is not None:
+                idle_pages.append(keep)
+            self._idle_slots.append({'browser': browser_info['browser'], 'context': context,
+                                     'idle_pages': idle_pages})
+            return True
+        except Exception:
+            return False
+
+    async def _acquire_page_async(self, browser_id: str) -> Page:
+        browser_info = self.browsers[browser_id]
+        browser_info['last_activity'] = time.time()
+        self.browsers.move_to_end(browser_id)
+        idle = browser_info.get('idle_pages')
+        if idle:
+            return idle.pop()
+        return await browser_info['context'].new_page()
+
+    async def _cleanup_inactive_browsers(self):
         """清理不活跃的浏览器"""
         current_time = time.time()
         inactive_threshold = 3600  # 1小时不活跃则清理
-        
+
         inactive_browsers = []
-        for browser_id, browser_info in self.browsers.items():
+        for browser_id, browser_info in list(self.browsers.items()):  # snapshot: MRU touches may reorder
             if current_time - browser_info['last_activity'] > inactive_threshold:
                 inactive_browsers.append(browser_id)
-        
+
         for browser_id in inactive_browsers:
-            self.close_browser(browser_id)
+            await self._close_browser_async(browser_id)
             if self.logger:
                 self.logger.info("[PLAYWRIGHT_POOL] Cleaned up inactive browser %s", browser_id)
 
-    def get_status(self):
-        """获取浏览器池状态"""
-        with self._lock:
-            active_count = len([b for b in self.browsers.values() if b['status'] == 'active'])
-            return {
-                'active': active_count,
-                'total': len(self.browsers),
-                'available': self.max_browsers - len(self.browsers),
-                'max_browsers': self.max_browsers
-            }
-
 
 class PlaywrightWebEnv(KwargsInitializable):
-    """基于Playwright的内置WebEnv实现"""
+    """基于Playwright的内置WebEnv实现
+
+    Page operations are coroutines on the shared Playwright event loop; the public
+    API (step_state/get_state/stop/...) stays synchronous so ThreadedWebEnv and the
+    agent are unaffected. Per step the page probe, accessibility snapshot and
+    screenshot run concurrently via asyncio.gather, so the step costs roughly the
+    slowest of the three CDP round trips rather than their sum.
+    """
 
     def __init__(self, settings=None, starting=True, starting_target_url=None, logger=None, **kwargs):
         # 基础配置 - 从TOML配置读取
@@ -219,6 +430,8 @@ class PlaywrightWebEnv(KwargsInitializable):
             self.headless = settings.web.env_builtin.headless
             self.web_timeout = settings.web.env_builtin.web_timeout
             self.screenshot_boxed = settings.web.env_builtin.screenshot_boxed
+            self.screenshot_format = settings.web.env_builtin.screenshot_format
+            self.screenshot_quality = settings.web.env_builtin.screenshot_quality
             self.target_url = settings.web.env_builtin.target_url
         else:
             # Fallback defaults if no settings provided
@@ -226,18 +439,26 @@ class PlaywrightWebEnv(KwargsInitializable):
             self.headless = True
             self.web_timeout = 600
             self.screenshot_boxed = True
+            self.screenshot_format = "jpeg"
+            self.screenshot_quality = 70
             self.target_url = "https://www.bing.com/"
 
         self.logger = logger
+        self.extract_html_md = True  # off when the agent has no html_md budget: skips full-DOM serialization
 
         # Playwright相关
         self.browser_pool = None
         self.current_browser_id = None
         self.current_page_id = None
+        self._current_page: Optional[Page] = None  # direct page ref: skips the per-action dict walk
 
         # 状态管理
         self.state: WebState = None
 
+        # markdown转换缓存: HTML内容hash -> markdown (导航循环/后退经常重访同一页面)
+        self._md_cache: "OrderedDict[bytes, str]" = OrderedDict()
+        self._md_cache_maxsize = 64
+
         super().__init__(**kwargs)
 
         # 创建浏览器池
@@ -245,7 +466,7 @@ class PlaywrightWebEnv(KwargsInitializable):
 
         if starting:
             self.start(starting_target_url)
-    
+
     def _create_browser_pool(self):
         """创建浏览器池"""
         self.browser_pool = PlaywrightBrowserPool(
@@ -254,35 +475,40 @@ class PlaywrightWebEnv(KwargsInitializable):
             logger=self.logger
         )
         self.browser_pool.start()
-    
+        # finalize代替__del__: 避免resurrection问题，pool.stop()是幂等的所以不会重复关闭
+        self._finalizer = weakref.finalize(self, PlaywrightWebEnv._finalize_pool, self.browser_pool)
+
+    @staticmethod
+    def _finalize_pool(browser_pool):
+        """进程退出/GC时兜底关闭浏览器池 (must not reference the env: it is already gone)"""
+        try:
+            browser_pool.stop(wait=False)  # never block finalization on the loop thread
+        except Exception:
+            pass
+
     def start(self, target_url=None):
         """启动web环境"""
         self.stop()  # 先停止现有环境
-        
+
         target_url = target_url if target_url is not None else self.target_url
-        
+
         # Google到Bing的重定向（保持与原有逻辑一致）
         if 'www.google.com' in target_url and 'www.google.com/maps' not in target_url:
             target_url = target_url.replace('www.google.com', 'www.bing.com')
-        
+
         self.init_state(target_url)
-    
+
     def stop(self):
         """停止web环境"""
         if self.current_browser_id and self.browser_pool:
             self.browser_pool.close_browser(self.current_browser_id)
             self.current_browser_id = None
             self.current_page_id = None
+        self._current_page = None
 
         if self.state is not None:
             self.state = None
 
-    def __del__(self):
-        """析构函数"""
-        self.stop()
-        if self.browser_pool:
-            self.browser_pool.stop()
-
     def get_state(self, export_to_dict=True, return_copy=True):
         """获取当前状态"""
         assert self.state is not None, "Current state is None, should first start it!"
@@ -311,7 +537,7 @@ class PlaywrightWebEnv(KwargsInitializable):
             self.logger.info("[PLAYWRIGHT_INIT] Browser_Created: %s", self.current_browser_id)
 
         # 打开页面
-        self.current_page_id = self._open_page(target_url)
+        self.current_page_id = _run_sync(self._open_page(target_url))
 
         if self.logger:
             self.logger.info("[PLAYWRIGHT_INIT] Page_Opened: %s", self.current_page_id)
@@ -327,7 +553,7 @@ class PlaywrightWebEnv(KwargsInitializable):
         )
 
         # 获取初始页面信息
-        results = self._get_accessibility_tree_results()
+        results = _run_sync(self._get_accessibility_tree_results())
         self.state.update(**results)
 
         if self.logger:
@@ -336,25 +562,27 @@ class PlaywrightWebEnv(KwargsInitializable):
             if actual_url != target_url:
                 self.logger.warning("[PLAYWRIGHT_INIT] URL_Mismatch: Expected: %s | Actual: %s", target_url, actual_url)
 
-    def _open_page(self, target_url: str) -> str:
+    async def _open_page(self, target_url: str) -> str:
         """打开新页面"""
         context = self.browser_pool.get_browser_context(self.current_browser_id)
         if not context:
             raise RuntimeError(f"Browser context not found for {self.current_browser_id}")
 
-        page = context.new_page()
+        page = await self.browser_pool._acquire_page_async(self.current_browser_id)  # warm page if recycled
         page_id = str(uuid.uuid4())
 
-        # 设置下载处理
+        # 设置下载处理 (handler recorded so the pool can detach it when recycling the page)
         page.on("download", self._handle_download)
+        self.browser_pool.browsers[self.current_browser_id]['download_handler'] = self._handle_download
 
         # 导航到目标URL
         try:
-            page.goto(target_url, wait_until="domcontentloaded", timeout=30000)
+            await page.goto(target_url, wait_until="domcontentloaded", timeout=30000)
 
             # 存储页面引用
             browser_info = self.browser_pool.browsers[self.current_browser_id]
             browser_info['pages'][page_id] = page
+            self._current_page = page
 
             if self.logger:
                 actual_url = page.url
@@ -367,7 +595,7 @@ class PlaywrightWebEnv(KwargsInitializable):
                 self.logger.error("[PLAYWRIGHT_PAGE] Failed to open %s: %s", target_url, e)
             raise
 
-    def _handle_download(self, download):
+    async def _handle_download(self, download):
         """处理文件下载"""
         try:
             # 生成下载文件路径
@@ -375,7 +603,7 @@ class PlaywrightWebEnv(KwargsInitializable):
             os.makedirs(os.path.dirname(download_path), exist_ok=True)
 
             # 保存文件
-            download.save_as(download_path)
+            await download.save_as(download_path)
 
             # 更新状态中的下载文件列表
             if self.state and hasattr(self.state, 'downloaded_file_path'):
@@ -389,39 +617,33 @@ class PlaywrightWebEnv(KwargsInitializable):
             if self.logger:
                 self.logger.error("[PLAYWRIGHT_DOWNLOAD] Failed: %s", e)
 
-    def _get_current_page(self) -> Optional[SyncPage]:
-        """获取当前页面对象"""
-        if not self.current_browser_id or not self.current_page_id:
-            return None
-
-        browser_info = self.browser_pool.browsers.get(self.current_browser_id)
-        if not browser_info:
-            return None
-
-        return browser_info['pages'].get(self.current_page_id)
+    def _get_current_page(self) -> Optional[Page]:
+        """获取当前页面对象 (cached on _open_page, invalidated by stop())"""
+        return self._current_page
 
-    def _get_accessibility_tree_results(self) -> Dict[str, Any]:
-        """获取可访问性树和页面信息"""
+    async def _get_accessibility_tree_results(self) -> Dict[str, Any]:
+        """获取可访问性树和页面信息 (probe/axtree/screenshot并发执行)"""
         page = self._get_current_page()
         if not page:
             return self._get_default_results()
 
         try:
-            # 获取基本页面信息
-            current_url = page.url
-            html_content = page.content()
-
-            # 处理HTML为Markdown
-            html_md = self._process_html(html_content)
-
-            # 获取可访问性树
-            accessibility_tree = self._get_accessibility_tree(page)
-
-            # 获取截图
-            screenshot_b64 = self._take_screenshot(page)
+            # 三个CDP往返并发: 总耗时≈最慢的一个而不是三者之和
+            probe, accessibility_tree, screenshot_b64 = await asyncio.gather(
+                page.evaluate(_PAGE_PROBE_JS, self.extract_html_md),
+                self._get_accessibility_tree(page),
+                self._take_screenshot(page),
+            )
+            current_url = probe["url"]
+
+            # 处理HTML为Markdown (CPU密集: 放到executor线程，不阻塞共享事件循环)
+            if self.extract_html_md:
+                html_md = await asyncio.get_running_loop().run_in_executor(
+                    None, self._process_html, probe["html"])
+            else:
+                html_md = ""
 
-            # 检查Cookie弹窗
-            has_cookie_popup = self._check_cookie_popup(page)
+            has_cookie_popup = bool(probe["hasCookie"])
 
             results = {
                 "current_accessibility_tree": accessibility_tree,
@@ -457,21 +679,30 @@ class PlaywrightWebEnv(KwargsInitializable):
         }
 
     def _process_html(self, html_content: str) -> str:
-        """处理HTML内容为Markdown"""
+        """处理HTML内容为Markdown (按内容hash缓存: 重访同一页面时跳过整个转换)"""
         if not html_content.strip():
             return ""
+        key = hashlib.blake2b(html_content.encode('utf-8', 'ignore'), digest_size=8).digest()
+        cached = self._md_cache.get(key)
+        if cached is not None:
+            self._md_cache.move_to_end(key)
+            return cached
         try:
-            return MyMarkdownify.md_convert(html_content)
+            result = MyMarkdownify.md_convert(html_content)
         except Exception as e:
             if self.logger:
                 self.logger.warning("[PLAYWRIGHT_HTML] Failed to convert HTML: %s", e)
             return ""
+        self._md_cache[key] = result
+        if len(self._md_cache) > self._md_cache_maxsize:
+            self._md_cache.popitem(last=False)
+        return result
 
-    def _get_accessibility_tree(self, page: SyncPage) -> str:
+    async def _get_accessibility_tree(self, page: Page) -> str:
         """获取可访问性树"""
         try:
             # 使用Playwright的accessibility API
-            snapshot = page.accessibility.snapshot()
+            snapshot = await page.accessibility.snapshot()
             if snapshot:
                 return self._format_accessibility_tree(snapshot)
             else:
@@ -481,67 +712,51 @@ class PlaywrightWebEnv(KwargsInitializable):
                 self.logger.warning("[PLAYWRIGHT_AXTREE] Failed to get accessibility tree: %s", e)
             return "**Warning**: Failed to get accessibility tree"
 
-    def _format_accessibility_tree(self, snapshot: Dict, level: int = 0) -> str:
-        """格式化可访问性树为文本"""
-        lines = []
-        indent = "  " * level
-
-        # 获取节点信息
-        role = snapshot.get('role', 'unknown')
-        name = snapshot.get('name', '')
-        value = snapshot.get('value', '')
-
-        # 构建节点描述
-        node_desc = f"{indent}[{level}] {role}"
-        if name:
-            node_desc += f" \"{name}\""
-        if value:
-            node_desc += f" value=\"{value}\""
-
-        lines.append(node_desc)
+    _INDENTS = ["  " * ii for ii in range(32)]  # precomputed indents for common depths
 
-        # 递归处理子节点
-        children = snapshot.get('children', [])
-        for child in children:
-            lines.extend(self._format_accessibility_tree(child, level + 1).split('\n'))
+    def _format_accessibility_tree(self, snapshot: Dict) -> str:
+        """格式化可访问性树为文本 (iterative DFS: one flat line list, joined once)"""
+        lines = []
+        indents = self._INDENTS
+        stack = [(snapshot, 0)]
+        while stack:
+            node, level = stack.pop()
+
+            # 获取节点信息
+            role = node.get('role', 'unknown')
+            name = node.get('name', '')
+            value = node.get('value', '')
+
+            # 构建节点描述
+            indent = indents[level] if level < len(indents) else "  " * level
+            node_desc = f"{indent}[{level}] {role}"
+            if name:
+                node_desc += f" \"{name}\""
+            if value:
+                node_desc += f" value=\"{value}\""
+            lines.append(node_desc)
+
+            # 子节点逆序入栈，保持先序输出顺序
+            for child in reversed(node.get('children', ())):
+                stack.append((child, level + 1))
 
         return '\n'.join(lines)
 
-    def _take_screenshot(self, page: SyncPage) -> str:
-        """截取页面截图并返回base64编码"""
+    async def _take_screenshot(self, page: Page) -> str:
+        """截取页面截图并返回base64编码 (JPEG默认: 比PNG小/快得多，LLM视觉输入足够)"""
         try:
-            screenshot_bytes = page.screenshot(full_page=False)
-            return base64.b64encode(screenshot_bytes).decode('utf-8')
+            if self.screenshot_format == "jpeg":
+                screenshot_bytes = await page.screenshot(
+                    type="jpeg", quality=self.screenshot_quality,
+                    full_page=False, animations="disabled")
+            else:
+                screenshot_bytes = await page.screenshot(full_page=False, animations="disabled")
+            return base64.b64encode(screenshot_bytes).decode('ascii')
         except Exception as e:
             if self.logger:
                 self.logger.warning("[PLAYWRIGHT_SCREENSHOT] Failed: %s", e)
             return ""
 
-    def _check_cookie_popup(self, page: SyncPage) -> bool:
-        """检查是否有Cookie弹窗"""
-        try:
-            # 常见的Cookie弹窗选择器
-            cookie_selectors = [
-                '[id*="cookie"]',
-                '[class*="cookie"]',
-                '[id*="consent"]',
-                '[class*="consent"]',
-                'button:has-text("Accept")',
-                'button:has-text("Allow")',
-                'button:has-text("Agree")'
-            ]
-
-            for selector in cookie_selectors:
-                elements = page.query_selector_all(selector)
-                if elements:
-                    return True
-
-            return False
-        except Exception as e:
-            if self.logger:
-                self.logger.warning("[PLAYWRIGHT_COOKIE] Cookie popup check failed: %s", e)
-            return False
-
     def step_state(self, action_string: str) -> str:
         """执行浏览器动作"""
         if self.logger:
@@ -562,7 +777,7 @@ class PlaywrightWebEnv(KwargsInitializable):
             return error_msg
 
         try:
-            success = self._perform_action(action)
+            success = _run_sync(self._perform_action(action))
 
             if not success:
                 error_msg = f"The action you have chosen cannot be executed: {action_string}"
@@ -575,7 +790,7 @@ class PlaywrightWebEnv(KwargsInitializable):
                 if self.logger:
                     self.logger.info("[PLAYWRIGHT_ACTION] Success: %s", action_string)
 
-                results = self._get_accessibility_tree_results()
+                results = _run_sync(self._get_accessibility_tree_results())
                 self.state.update(**results)
                 return f"Browser step: {action_string}"
 
@@ -599,12 +814,11 @@ class PlaywrightWebEnv(KwargsInitializable):
 
         action_string = action_string.strip()
 
-        # 解析不同类型的动作
+        # 解析不同类型的动作 (patterns precompiled at module scope)
         if action_string.startswith("click"):
             action["action_name"] = "click"
             # 解析 click [id] name 格式
-            import re
-            match = re.match(r'click\s+\[(\d+)\]\s*(.*)', action_string)
+            match = _CLICK_RE.match(action_string)
             if match:
                 action["target_id"] = int(match.group(1))
                 action["target_element_name"] = match.group(2).strip()
@@ -613,18 +827,17 @@ class PlaywrightWebEnv(KwargsInitializable):
         elif action_string.startswith("type"):
             action["action_name"] = "type"
             # 解析 type [id] content 格式
-            import re
-            match = re.match(r'type\s+\[(\d+)\]\s+(.*?)(?:\[NOENTER\])?$', action_string)
+            match = _TYPE_RE.match(action_string)
             if match:
                 action["target_id"] = int(match.group(1))
                 action["action_value"] = match.group(2).strip()
                 action["target_element_type"] = "textbox"
                 action["need_enter"] = "[NOENTER]" not in action_string
 
-        elif action_string in ["scroll_up", "scroll up"]:
+        elif action_string in _SCROLL_UP_ACTIONS:
             action["action_name"] = "scroll_up"
 
-        elif action_string in ["scroll_down", "scroll down"]:
+        elif action_string in _SCROLL_DOWN_ACTIONS:
             action["action_name"] = "scroll_down"
 
         elif action_string == "wait":
@@ -657,7 +870,7 @@ class PlaywrightWebEnv(KwargsInitializable):
 
         return action
 
-    def _perform_action(self, action: Dict[str, Any]) -> bool:
+    async def _perform_action(self, action: Dict[str, Any]) -> bool:
         """执行具体的浏览器动作"""
         page = self._get_current_page()
         if not page:
@@ -667,35 +880,35 @@ class PlaywrightWebEnv(KwargsInitializable):
 
         try:
             if action_name == "click":
-                return self._perform_click(page, action)
+                return await self._perform_click(page, action)
 
             elif action_name == "type":
-                return self._perform_type(page, action)
+                return await self._perform_type(page, action)
 
             elif action_name == "scroll_up":
-                page.keyboard.press("PageUp")
+                await page.keyboard.press("PageUp")
                 return True
 
             elif action_name == "scroll_down":
-                page.keyboard.press("PageDown")
+                await page.keyboard.press("PageDown")
                 return True
 
             elif action_name == "wait":
-                time.sleep(5)
+                await asyncio.sleep(5)  # must not block the shared loop
                 return True
 
             elif action_name == "goback":
-                page.go_back(wait_until="domcontentloaded")
+                await page.go_back(wait_until="domcontentloaded")
                 return True
 
             elif action_name == "restart":
-                page.goto(self.target_url, wait_until="domcontentloaded")
+                await page.goto(self.target_url, wait_until="domcontentloaded")
                 return True
 
             elif action_name == "goto":
                 url = action.get("action_value", "")
                 if url:
-                    page.goto(url, wait_until="domcontentloaded")
+                    await page.goto(url, wait_until="domcontentloaded")
                     return True
                 return False
 
@@ -713,7 +926,7 @@ class PlaywrightWebEnv(KwargsInitializable):
                 self.logger.error("[PLAYWRIGHT_ACTION] Error executing %s: %s", action_name, e)
             return False
 
-    def _perform_click(self, page: SyncPage, action: Dict[str, Any]) -> bool:
+    async def _perform_click(self, page: Page, action: Dict[str, Any]) -> bool:
         """执行点击动作"""
         target_id = action.get("target_id")
         if target_id is None:
@@ -735,25 +948,25 @@ class PlaywrightWebEnv(KwargsInitializable):
             element = None
             for selector in selectors:
                 try:
-                    element = page.query_selector(selector)
+                    element = await page.query_selector(selector)
                     if element:
                         break
                 except:
                     continue
 
             if element:
-                element.click()
+                await element.click()
                 return True
             else:
                 # 如果找不到特定元素，尝试通过可访问性树查找
-                return self._click_by_accessibility_tree(page, target_id)
+                return await self._click_by_accessibility_tree(page, target_id)
 
         except Exception as e:
             if self.logger:
                 self.logger.error("[PLAYWRIGHT_CLICK] Error: %s", e)
             return False
 
-    def _perform_type(self, page: SyncPage, action: Dict[str, Any]) -> bool:
+    async def _perform_type(self, page: Page, action: Dict[str, Any]) -> bool:
         """执行输入动作"""
         target_id = action.get("target_id")
         text = action.get("action_value", "")
@@ -776,37 +989,37 @@ class PlaywrightWebEnv(KwargsInitializable):
             element = None
             for selector in selectors:
                 try:
-                    element = page.query_selector(selector)
-                    if element and element.is_visible():
+                    element = await page.query_selector(selector)
+                    if element and await element.is_visible():
                         break
                 except:
                     continue
 
             if element:
-                element.click()  # 先点击获得焦点
-                element.clear()  # 清空现有内容
-                element.type(text)  # 输入文本
+                await element.click()  # 先点击获得焦点
+                await element.fill("")  # 清空现有内容
+                await element.type(text)  # 输入文本
 
                 if need_enter:
-                    element.press("Enter")
+                    await element.press("Enter")
 
                 return True
             else:
-                return self._type_by_accessibility_tree(page, target_id, text, need_enter)
+                return await self._type_by_accessibility_tree(page, target_id, text, need_enter)
 
         except Exception as e:
             if self.logger:
                 self.logger.error("[PLAYWRIGHT_TYPE] Error: %s", e)
             return False
 
-    def _click_by_accessibility_tree(self, page: SyncPage, target_id: int) -> bool:
+    async def _click_by_accessibility_tree(self, page: Page, target_id: int) -> bool:
         """通过可访问性树查找并点击元素"""
         try:
             # 获取所有可点击元素
-            clickable_elements = page.query_selector_all('button, a, [role="button"], [onclick], input[type="submit"], input[type="button"]')
+            clickable_elements = await page.query_selector_all('button, a, [role="button"], [onclick], input[type="submit"], input[type="button"]')
 
             if target_id < len(clickable_elements):
-                clickable_elements[target_id].click()
+                await clickable_elements[target_id].click()
                 return True
 
             return False
@@ -815,20 +1028,20 @@ class PlaywrightWebEnv(KwargsInitializable):
                 self.logger.error("[PLAYWRIGHT_CLICK_AX] Error: %s", e)
             return False
 
-    def _type_by_accessibility_tree(self, page: SyncPage, target_id: int, text: str, need_enter: bool) -> bool:
+    async def _type_by_accessibility_tree(self, page: Page, target_id: int, text: str, need_enter: bool) -> bool:
         """通过可访问性树查找并输入文本"""
         try:
             # 获取所有输入元素
-            input_elements = page.query_selector_all('input[type="text"], input[type="search"], input[type="email"], input[type="password"], textarea')
+            input_elements = await page.query_selector_all('input[type="text"], input[type="search"], input[type="email"], input[type="password"], textarea')
 
             if target_id < len(input_elements):
                 element = input_elements[target_id]
-                element.click()
-                element.clear()
-                element.type(text)
+                await element.click()
+                await element.fill("")
+                await element.type(text)
 
                 if need_enter:
-                    element.press("Enter")
+                    await element.press("Enter")
 
                 return True
 
@@ -1,5 +1,10 @@
 #
 
+def _image_data_url(b64_data: str) -> str:
+    # sniff the actual encoding: JPEG base64 starts with "/9j/", PNG with "iVBOR"
+    mime = "image/jpeg" if b64_data.startswith("/9j/") else "image/png"
+    return f"data:{mime};base64,{b64_data}"
+
 _COMMON_GUIDELINES = """
 ## Action Guidelines
 1`. **Valid Actions**: Only issue actions that are valid based on the current observation (accessibility tree). For example, do NOT type into buttons, do NOT click on StaticText. If there are no suitable elements in the accessibility tree, do NOT fake ones and do NOT use placeholders like `[id]`.
@@ -171,8 +176,8 @@ def web_plan(**kwargs):
     if kwargs.get('screenshot'):
         # if screenshot is enabled
         user_content[-1]['text'] += f"## Current Screenshot\nHere is the current webpage's screenshot:\n"
-        user_content.append({'type': 'image_url', 
-                             'image_url': {"url": f"data:image/png;base64,{kwargs['screenshot']}"}})
+        user_content.append({'type': 'image_url',
+                             'image_url': {"url": _image_data_url(kwargs['screenshot'])}})
         user_content.append({'type': 'text', 'text': "\n\n"})
     else:
         # otherwise only input the textual content
@@ -212,7 +217,7 @@ def web_action(**kwargs):
     user_content[-1]['text'] += f"## Current Accessibility Tree\n{kwargs['web_page']}\n\n"
     if kwargs.get('screenshot'):
         user_content[-1]['text'] += f"## Current Screenshot\nHere is the current webpage's screenshot:\n"
-        user_content.append({'type': 'image_url', 'image_url': {"url": f"data:image/png;base64,{kwargs['screenshot']}"}})
+        user_content.append({'type': 'image_url', 'image_url': {"url": _image_data_url(kwargs['screenshot'])}})
         user_content.append({'type': 'text', 'text': "\n\n"})
     else:
         user_content[-1]['text'] += f"## Current Screenshot\n{kwargs.get('screenshot_note')}\n\n"
@@ -50,6 +50,8 @@ class WebEnvBuiltinConfig:
     headless: bool = True
     web_timeout: int = 600
     screenshot_boxed: bool = True
+    screenshot_format: str = "jpeg"  # jpeg|png (jpeg is much smaller/faster for LLM vision input)
+    screenshot_quality: int = 70  # only used for jpeg
     target_url: str = "https://www.bing.com/"
 
 
@@ -342,6 +344,8 @@ class Settings:
             headless=env_data.get("headless", True),
             web_timeout=env_data.get("web_timeout", 600),
             screenshot_boxed=env_data.get("screenshot_boxed", True),
+            screenshot_format=env_data.get("screenshot_format", "jpeg"),
+            screenshot_quality=env_data.get("screenshot_quality", 70),
             target_url=env_data.get("target_url", "https://www.bing.com/")
         )
 
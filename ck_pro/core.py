@@ -221,11 +221,12 @@ class CognitiveKernel:
 
             for step_info in session_generator:
                 generator_has_items = True
-                step_count += 1
                 step_type = step_info.get("type", "unknown")
 
                 # FIX 2: Only process plan and action steps for streaming display
+                # (other event types, e.g. plan_started, pass through without bumping the count)
                 if step_type in ["plan", "action"]:
+                    step_count += 1
                     # Format ONLY the current step content
                     current_step_content = self._format_step_for_streaming(step_info, step_count)
 
@@ -1,5 +1,6 @@
 import sys
 import os
+import time
 import types
 import threading
 
@@ -125,8 +126,11 @@ def test_threaded_webenv_runs_all_calls_on_same_dedicated_thread_and_cleans_up()
     assert created != 'MainThread'
     assert all(t == created for t in call_threads)
 
-    # Ensure cleanup releases resources
+    # Ensure cleanup releases resources (teardown runs asynchronously on the worker thread)
     agent.end_run(session)
+    deadline = time.time() + 5
+    while not (stub.stopped and stub.browser_pool.stopped) and time.time() < deadline:
+        time.sleep(0.01)
     assert stub.stopped is True
     assert stub.browser_pool.stopped is True
 